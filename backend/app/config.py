@@ -5,6 +5,11 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     # Database
     database_url: str = "sqlite+aiosqlite:///./data/audiobooks.db"
+    # SQLite tuning applied to every connection (WAL is always on)
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_cache_size_mb: int = 64
+    sqlite_mmap_size_mb: int = 256
+    sqlite_busy_timeout_ms: int = 10000
 
     # Authentication
     admin_password_hash: str = ""
@@ -15,6 +20,97 @@ class Settings(BaseSettings):
     # Downloads
     books_output_dir: str = "/audiobooks"
 
+    # Tokybook segment fetch concurrency (adaptive, shared by all books)
+    segment_concurrency_initial: int = 4
+    segment_concurrency_min: int = 1
+    segment_concurrency_max: int = 32
+
+    # Embedded cover art is downscaled/recompressed once per book
+    cover_max_dimension: int = 600
+    cover_max_bytes: int = 200 * 1024
+
+    # Post-processing: "" (disabled), "m4b" or "mka" single-file output
+    assemble_format: str = ""
+    assemble_keep_chapters: bool = True
+    # m4b output is re-encoded to AAC at this bitrate
+    assemble_aac_bitrate_kbps: int = 64
+    transcode_workers: int = 2
+
+    # Download bandwidth (KiB/s, 0 = unlimited); windows like "01:00-07:00" lift limits.
+    # Defaults until limits are set through the API, which stores them in the
+    # database; separate workers pick changes up every worker_sync_interval
+    bandwidth_global_limit_kib: int = 0
+    bandwidth_site_limits_kib: dict[str, int] = {}
+    bandwidth_full_speed_windows: list[str] = []
+
+    # Hash finished chapters and hard-link byte-identical ones (e.g. a book downloaded twice)
+    dedup_hardlink_chapters: bool = False
+
+    # Disk usage: refuse books that would leave less than min_free_space_mb free
+    disk_preflight: bool = True
+    min_free_space_mb: int = 1024
+    preallocate_chapters: bool = True
+
+    # Worker progress (current chapter, chapter records) is committed at most this often
+    progress_flush_interval: float = 5.0
+
+    # Library scanner: indexes the audio files under books_output_dir every
+    # library_scan_interval seconds (0 disables periodic scans)
+    library_scan_interval: float = 3600.0
+    library_scan_workers: int = 4
+    # Lifetime of the signed URLs used to play chapters in the browser; the
+    # player fetches fresh ones when a URL expires mid-chapter
+    stream_url_ttl: int = 15 * 60
+
+    # Retention: finished queue items older than this are archived (or just
+    # deleted) every retention_interval seconds; 0 days keeps them forever
+    queue_retention_days: int = 30
+    queue_archive: bool = True
+    retention_interval: float = 6 * 3600
+    # Error messages of finished items are cut to this many characters
+    error_message_max_length: int = 2000
+
+    # Worker supervision: leases, stall watchdog and automatic retries.
+    # Downloads run in the API process unless run_embedded_worker is off and
+    # `python -m app.worker` runs separately (use event_backend "sqlite" then).
+    run_embedded_worker: bool = True
+    # Also how often a separate worker checks for cancellation
+    heartbeat_interval: float = 5.0
+    lease_timeout: float = 60.0
+    stall_timeout: float = 120.0
+    max_attempts: int = 3
+    supervisor_poll_interval: float = 10.0
+    # How often a separate worker reloads bandwidth limits and publishes its metrics
+    worker_sync_interval: float = 5.0
+    # How often API processes without the background jobs check whether they can take them over
+    leader_poll_interval: float = 10.0
+
+    # Metadata, chapter lists and covers are fetched ahead for this many pending items
+    prefetch_count: int = 2
+    prefetch_ttl: float = 900.0
+
+    # Bulk imports: URLs accepted per request, metadata lookups run at once
+    import_max_urls: int = 1000
+    import_resolve_concurrency: int = 4
+
+    # Scraped chapter lists are reused by retries/restarts up to this age (seconds)
+    manifest_max_age: float = 7 * 24 * 3600
+
+    # Switch to an equivalent book on another site when the source fails or
+    # stays below mirror_min_throughput_kib for mirror_slow_chapters chapters
+    mirror_failover: bool = True
+    mirror_min_throughput_kib: int = 64
+    mirror_slow_chapters: int = 2
+
+    # Events a live-status connection may have queued before it is dropped
+    sse_buffer_size: int = 256
+    # Recent events kept so reconnecting clients (Last-Event-ID) only get what they missed
+    event_history_size: int = 1000
+    # "memory" (single process) or "sqlite" (events shared through the database,
+    # for several uvicorn workers or a separate download worker)
+    event_backend: str = "memory"
+    event_poll_interval: float = 0.25
+
     # CORS (for development)
     cors_origins: list[str] = ["http://localhost:3000"]
 
@@ -1,3 +1,6 @@
+import os
+
+from sqlalchemy import event, inspect, literal, text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 
@@ -13,6 +16,22 @@ engine = create_async_engine(
     echo=False,
 )
 
+
+@event.listens_for(engine.sync_engine, "connect")
+def _configure_sqlite(dbapi_connection, connection_record):
+    """WAL lets the worker commit while the API reads; busy_timeout makes
+    writers wait for each other instead of failing with "database is locked"."""
+    if engine.dialect.name != "sqlite":
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_size_mb * 1024}")
+    cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size_mb * 1024 * 1024}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+    cursor.close()
+
+
 async_session_maker = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -25,6 +44,163 @@ async def get_db():
         yield session
 
 
+def _sync_schema(conn):
+    """Add columns and indexes introduced after a table was first created.
+
+    ``create_all`` only creates missing tables, so existing databases would
+    otherwise never pick up new (nullable or defaulted) columns.
+    """
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(conn.dialect)}"
+            if column.default is not None and column.default.is_scalar:
+                value = literal(column.default.arg).compile(
+                    dialect=conn.dialect, compile_kwargs={"literal_binds": True}
+                )
+                ddl += f" DEFAULT {value}"
+            conn.execute(text(ddl))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _create_download_fts(conn):
+    """Full-text index over download titles, authors and narrators.
+
+    An external-content FTS5 table stores only the index; triggers keep it
+    in step with ``downloads``.
+    """
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS downloads_fts USING fts5("
+        "title, author, narrator, content='downloads', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS downloads_fts_insert AFTER INSERT ON downloads BEGIN "
+        "INSERT INTO downloads_fts(rowid, title, author, narrator) "
+        "VALUES (new.id, new.title, new.author, new.narrator); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS downloads_fts_delete AFTER DELETE ON downloads BEGIN "
+        "INSERT INTO downloads_fts(downloads_fts, rowid, title, author, narrator) "
+        "VALUES ('delete', old.id, old.title, old.author, old.narrator); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS downloads_fts_update "
+        "AFTER UPDATE OF title, author, narrator ON downloads BEGIN "
+        "INSERT INTO downloads_fts(downloads_fts, rowid, title, author, narrator) "
+        "VALUES ('delete', old.id, old.title, old.author, old.narrator); "
+        "INSERT INTO downloads_fts(rowid, title, author, narrator) "
+        "VALUES (new.id, new.title, new.author, new.narrator); END"
+    ))
+    conn.execute(text("INSERT INTO downloads_fts(downloads_fts) VALUES ('rebuild')"))
+
+
+def _add_queue_updated_at(conn):
+    _sync_schema(conn)
+    conn.execute(text("UPDATE queue SET updated_at = created_at WHERE updated_at IS NULL"))
+
+
+def _normalize_stored_paths(conn):
+    """Store download and chapter paths the way the library scanner does."""
+    for table, column in (("downloads", "file_path"), ("chapter_files", "path")):
+        rows = conn.execute(
+            text(f"SELECT id, {column} FROM {table} WHERE {column} IS NOT NULL")
+        ).all()
+        changed = [
+            {"id": row_id, "path": os.path.normpath(path)}
+            for row_id, path in rows
+            if os.path.normpath(path) != path
+        ]
+        if changed:
+            conn.execute(text(f"UPDATE {table} SET {column} = :path WHERE id = :id"), changed)
+
+
+def _queue_autoincrement(conn):
+    """Rebuild ``queue`` with ``AUTOINCREMENT``, so deleting rows never frees their ids.
+
+    The sequence starts past every queue id recorded elsewhere, including
+    ids an older database already handed out twice.
+    """
+    _sync_schema(conn)
+    ddl = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'queue'")
+    ).scalar()
+    if "AUTOINCREMENT" in ddl.upper():
+        return
+    queue = Base.metadata.tables["queue"]
+    for index in inspect(conn).get_indexes("queue"):
+        conn.execute(text(f"DROP INDEX {index['name']}"))
+    conn.execute(text("ALTER TABLE queue RENAME TO queue_old"))
+    queue.create(conn)
+    columns = ", ".join(c.name for c in queue.columns)
+    conn.execute(text(f"INSERT INTO queue ({columns}) SELECT {columns} FROM queue_old"))
+    conn.execute(text("DROP TABLE queue_old"))
+
+    seq = conn.execute(text(
+        "SELECT MAX(id) FROM ("
+        "SELECT MAX(id) AS id FROM queue UNION ALL "
+        "SELECT MAX(id) FROM queue_archive UNION ALL "
+        "SELECT MAX(queue_id) FROM downloads UNION ALL "
+        "SELECT MAX(queue_id) FROM chapter_files)"
+    )).scalar() or 0
+    conn.execute(text("DELETE FROM sqlite_sequence WHERE name = 'queue'"))
+    conn.execute(
+        text("INSERT INTO sqlite_sequence (name, seq) VALUES ('queue', :seq)"), {"seq": seq}
+    )
+
+
+def _add_chapter_book_dir(conn):
+    _sync_schema(conn)
+    rows = conn.execute(text("SELECT id, path FROM chapter_files WHERE book_dir IS NULL")).all()
+    if rows:
+        conn.execute(
+            text("UPDATE chapter_files SET book_dir = :book_dir WHERE id = :id"),
+            [{"id": row_id, "book_dir": os.path.dirname(path)} for row_id, path in rows],
+        )
+
+
+# Versioned schema changes for existing databases, applied once each and in
+# order. Migrations must be idempotent: new databases get the current schema
+# from create_all before they run.
+MIGRATIONS = [
+    (1, "add columns and indexes missing from older databases", _sync_schema),
+    (2, "full-text index for download history", _create_download_fts),
+    (3, "track when queue items change", _add_queue_updated_at),
+    (4, "hash chapter audio apart from its tags", _sync_schema),
+    (5, "normalize stored download and chapter paths", _normalize_stored_paths),
+    (6, "never reuse queue ids", _queue_autoincrement),
+    (7, "find chapter files by book directory", _add_chapter_book_dir),
+]
+
+
+def _run_migrations(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+        "applied_at DATETIME DEFAULT CURRENT_TIMESTAMP)"
+    ))
+    applied = set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+    for version, name, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        print(f"Applying schema migration {version}: {name}")
+        migrate(conn)
+        conn.execute(
+            text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+            {"version": version, "name": name},
+        )
+
+
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_run_migrations)
+        if engine.dialect.name == "sqlite":
+            # Refreshes planner statistics for tables whose shape changed
+            await conn.execute(text("PRAGMA optimize"))
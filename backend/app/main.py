@@ -4,16 +4,49 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
-from app.database import init_db
-from app.routers import auth, search, queue, downloads, status
+from app.database import async_session_maker, init_db
+from app.routers import auth, search, queue, downloads, status, bandwidth, library
+from app.services.dedup import backfill_dedup_keys
+from app.services.event_bus import create_event_backend
+from app.services.leader import leader_election
+from app.services.library import library_scanner
+from app.services.progress_tracker import progress_tracker
+from app.services.retention import retention_job
+from app.services.worker_supervisor import worker_supervisor
+from app.services.worker_sync import load_bandwidth_config, worker_sync
+
+
+async def start_background_jobs():
+    if settings.run_embedded_worker:
+        # Resumes interrupted downloads and anything still pending
+        worker_supervisor.start()
+        # Follows bandwidth changes made through the other API processes
+        worker_sync.start()
+    retention_job.start()
+    library_scanner.start()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     await init_db()
+    async with async_session_maker() as db:
+        await backfill_dedup_keys(db)
+    # Limits last set through the API take precedence over the settings
+    await load_bandwidth_config()
+    await progress_tracker.start(create_event_backend())
+    # With several uvicorn workers, only one process runs these
+    leader_election.start(start_background_jobs)
     yield
     # Shutdown
+    await leader_election.stop()
+    if leader_election.is_leader:
+        await library_scanner.stop()
+        await retention_job.stop()
+        await worker_supervisor.stop()
+        await worker_sync.stop()
+        leader_election.release()
+    await progress_tracker.stop()
 
 
 app = FastAPI(
@@ -37,6 +70,8 @@ app.include_router(search.router, prefix="/api/search", tags=["search"])
 app.include_router(queue.router, prefix="/api/queue", tags=["queue"])
 app.include_router(downloads.router, prefix="/api/downloads", tags=["downloads"])
 app.include_router(status.router, prefix="/api/status", tags=["status"])
+app.include_router(bandwidth.router, prefix="/api/bandwidth", tags=["bandwidth"])
+app.include_router(library.router, prefix="/api/library", tags=["library"])
 
 
 @app.get("/api/health")
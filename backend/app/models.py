@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import String, Integer, Text, DateTime, func
+from sqlalchemy import String, Integer, BigInteger, Boolean, Float, Text, DateTime, Index, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -10,21 +10,62 @@ class QueueItem(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     url: Mapped[str] = mapped_column(Text, nullable=False)
+    normalized_url: Mapped[str | None] = mapped_column(Text, index=True)
     title: Mapped[str | None] = mapped_column(String(500))
+    title_key: Mapped[str | None] = mapped_column(String(500), index=True)
     author: Mapped[str | None] = mapped_column(String(255))
     narrator: Mapped[str | None] = mapped_column(String(255))
     site: Mapped[str | None] = mapped_column(String(100))
     cover_url: Mapped[str | None] = mapped_column(Text)
+    allow_duplicate: Mapped[bool] = mapped_column(Boolean, default=False)
     status: Mapped[str] = mapped_column(String(50), default="pending")
     # Status values: pending, fetching, downloading, completed, failed, cancelled
+    # Higher runs first; fair_seq interleaves sites within a priority
+    priority: Mapped[int] = mapped_column(Integer, default=0)
+    fair_seq: Mapped[int] = mapped_column(Integer, default=0)
     current_chapter: Mapped[int] = mapped_column(Integer, default=0)
     total_chapters: Mapped[int] = mapped_column(Integer, default=0)
     error_message: Mapped[str | None] = mapped_column(Text)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    # Lease: the worker processing the item renews heartbeat_at while it runs
+    worker_id: Mapped[str | None] = mapped_column(String(100))
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime)
     created_at: Mapped[datetime] = mapped_column(
         DateTime, server_default=func.now()
     )
     started_at: Mapped[datetime | None] = mapped_column(DateTime)
     completed_at: Mapped[datetime | None] = mapped_column(DateTime)
+    # Bumped by every ORM or Core update, so clients can poll for changes
+    updated_at: Mapped[datetime | None] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True
+    )
+
+    __table_args__ = (
+        # Matches the worker's claim query (see services.queue_scheduler)
+        Index("ix_queue_claim", "status", priority.desc(), "fair_seq", "created_at"),
+        # Status filters and newest-first listings
+        Index("ix_queue_status_created", "status", "created_at"),
+        Index("ix_queue_created", "created_at"),
+        # Never hand out an id again: downloads, chapter files and the archive
+        # outlive the queue rows they refer to
+        {"sqlite_autoincrement": True},
+    )
+
+
+class ArchivedQueueItem(Base):
+    """Compact record of a finished queue item removed by the retention job."""
+
+    __tablename__ = "queue_archive"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    url: Mapped[str] = mapped_column(Text, nullable=False)
+    title: Mapped[str | None] = mapped_column(String(500))
+    author: Mapped[str | None] = mapped_column(String(255))
+    status: Mapped[str] = mapped_column(String(20))
+    error_message: Mapped[str | None] = mapped_column(Text)
+    created_at: Mapped[datetime | None] = mapped_column(DateTime)
+    completed_at: Mapped[datetime | None] = mapped_column(DateTime)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
 
 class Download(Base):
@@ -32,8 +73,10 @@ class Download(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     queue_id: Mapped[int | None] = mapped_column(Integer)
-    url: Mapped[str] = mapped_column(Text, nullable=False)
+    url: Mapped[str] = mapped_column(Text, nullable=False, index=True)
+    normalized_url: Mapped[str | None] = mapped_column(Text, index=True)
     title: Mapped[str] = mapped_column(String(500), nullable=False)
+    title_key: Mapped[str | None] = mapped_column(String(500), index=True)
     author: Mapped[str | None] = mapped_column(String(255))
     narrator: Mapped[str | None] = mapped_column(String(255))
     year: Mapped[str | None] = mapped_column(String(10))
@@ -42,5 +85,96 @@ class Download(Base):
     chapters_total: Mapped[int] = mapped_column(Integer, default=0)
     file_path: Mapped[str | None] = mapped_column(Text)
     completed_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), index=True
+    )
+
+
+class LibraryFile(Base):
+    """An audio file under ``books_output_dir``, as last seen by the library scanner."""
+
+    __tablename__ = "library_files"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    path: Mapped[str] = mapped_column(Text, nullable=False, unique=True)
+    book_dir: Mapped[str] = mapped_column(Text, nullable=False, index=True)
+    size: Mapped[int] = mapped_column(BigInteger)
+    mtime_ns: Mapped[int] = mapped_column(BigInteger)
+    format: Mapped[str | None] = mapped_column(String(20))
+    duration: Mapped[float | None] = mapped_column(Float)
+    bitrate: Mapped[int | None] = mapped_column(Integer)
+    # Why the file couldn't be read as audio, if it couldn't
+    error: Mapped[str | None] = mapped_column(Text)
+    scanned_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class ChapterFile(Base):
+    __tablename__ = "chapter_files"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    queue_id: Mapped[int] = mapped_column(Integer, index=True)
+    chapter: Mapped[int] = mapped_column(Integer)
+    path: Mapped[str] = mapped_column(Text, nullable=False, index=True)
+    # The book's directory, matching Download.file_path; queue ids don't outlive the queue
+    book_dir: Mapped[str | None] = mapped_column(Text, index=True)
+    size: Mapped[int] = mapped_column(BigInteger)
+    sha256: Mapped[str] = mapped_column(String(64), index=True)
+    # Hash of the audio alone, without the per-book ID3 tag; used to find duplicates
+    audio_sha256: Mapped[str | None] = mapped_column(String(64), index=True)
+    expected_size: Mapped[int | None] = mapped_column(BigInteger)
+    format: Mapped[str | None] = mapped_column(String(20))
+    verified: Mapped[bool] = mapped_column(Boolean, default=False)
+    error: Mapped[str | None] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(
         DateTime, server_default=func.now()
     )
+
+
+class BookManifest(Base):
+    """Scraped book data (chapter list, tokens, headers) kept for retries.
+
+    ``data`` is compact JSON; each chapter also carries its download state
+    (``status``, ``size``, ``sha256``).
+    """
+
+    __tablename__ = "manifests"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    queue_id: Mapped[int] = mapped_column(Integer, unique=True, index=True)
+    version: Mapped[int] = mapped_column(Integer)
+    fetched_at: Mapped[datetime] = mapped_column(DateTime)
+    data: Mapped[str] = mapped_column(Text, nullable=False)
+
+
+class Event(Base):
+    """Progress events shared between processes (``event_backend = "sqlite"``)."""
+
+    __tablename__ = "events"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    type: Mapped[str] = mapped_column(String(50))
+    data: Mapped[str] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now()
+    )
+
+
+class BandwidthSettings(Base):
+    """Bandwidth limits set through the API (a single row), for every worker process."""
+
+    __tablename__ = "bandwidth_settings"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # JSON: global_limit_kib, site_limits_kib, full_speed_windows
+    data: Mapped[str] = mapped_column(Text, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class WorkerStatus(Base):
+    """Latest metrics of a separate download worker (``python -m app.worker``)."""
+
+    __tablename__ = "worker_status"
+
+    worker_id: Mapped[str] = mapped_column(String(200), primary_key=True)
+    # JSON: segment limiter and bandwidth scheduler snapshots
+    data: Mapped[str] = mapped_column(Text, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -1,3 +1,3 @@
-from app.routers import auth, search, queue, downloads, status
+from app.routers import auth, search, queue, downloads, status, bandwidth, library
 
-__all__ = ["auth", "search", "queue", "downloads", "status"]
+__all__ = ["auth", "search", "queue", "downloads", "status", "bandwidth", "library"]
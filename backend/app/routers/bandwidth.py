@@ -0,0 +1,46 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.auth import get_current_user
+from app.schemas import BandwidthConfig, BandwidthStatus
+from app.services.bandwidth import bandwidth_scheduler
+from app.services.worker_sync import save_bandwidth_config, worker_metrics
+
+router = APIRouter()
+
+
+async def _status() -> BandwidthStatus:
+    snapshot = bandwidth_scheduler.snapshot()
+    # Items downloading in separate worker processes
+    for metrics in (await worker_metrics()).values():
+        snapshot["active_items"] += metrics["bandwidth"]["active_items"]
+    return BandwidthStatus(**snapshot)
+
+
+@router.get("", response_model=BandwidthStatus)
+async def get_bandwidth(
+    _user: Annotated[str, Depends(get_current_user)],
+):
+    return await _status()
+
+
+@router.put("", response_model=BandwidthStatus)
+async def update_bandwidth(
+    config: BandwidthConfig,
+    _user: Annotated[str, Depends(get_current_user)],
+):
+    try:
+        bandwidth_scheduler.configure(
+            config.global_limit_kib,
+            config.site_limits_kib,
+            config.full_speed_windows,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid full-speed window: {e}",
+        )
+    # Separate workers pick the new limits up within worker_sync_interval
+    await save_bandwidth_config()
+    return await _status()
@@ -1,13 +1,28 @@
+import asyncio
+import os
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy import select, func, delete
+from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import get_current_user
 from app.database import get_db
-from app.models import Download
-from app.schemas import DownloadResponse, DownloadsListResponse
+from app.models import ChapterFile, Download
+from app.schemas import (
+    ChapterVerifyResult,
+    DownloadResponse,
+    DownloadsListResponse,
+    VerifyResponse,
+)
+from app.services.dedup import hash_file
+from app.services.download_search import (
+    count_downloads,
+    fts_query,
+    invalidate_counts,
+    list_downloads,
+)
+from app.services.pagination import InvalidCursorError
 
 router = APIRouter()
 
@@ -19,31 +34,28 @@ async def get_downloads(
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
     search: str | None = None,
+    cursor: str | None = None,
 ):
-    query = select(Download)
-
-    if search:
-        search_term = f"%{search}%"
-        query = query.where(
-            Download.title.ilike(search_term) | Download.author.ilike(search_term)
+    """List downloads newest first, or ranked by relevance when searching.
+
+    Pass the returned ``next_cursor`` as ``cursor`` to get the next page;
+    ``page`` still works but gets slower the deeper it goes.
+    """
+    match = fts_query(search)
+    try:
+        items, next_cursor = await list_downloads(
+            db, limit, match=match, cursor=cursor, offset=(page - 1) * limit
         )
-
-    # Get total count
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
-
-    # Get paginated results
-    offset = (page - 1) * limit
-    query = query.order_by(Download.completed_at.desc()).offset(offset).limit(limit)
-    result = await db.execute(query)
-    items = result.scalars().all()
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    total = await count_downloads(db, match)
 
     return DownloadsListResponse(
         items=[DownloadResponse.model_validate(i) for i in items],
         total=total,
         page=page,
         limit=limit,
+        next_cursor=next_cursor,
     )
 
 
@@ -62,6 +74,65 @@ async def get_download(
     return DownloadResponse.model_validate(item)
 
 
+def _verify_chapter(chapter: ChapterFile) -> ChapterVerifyResult:
+    result = ChapterVerifyResult(
+        chapter=chapter.chapter,
+        path=chapter.path,
+        ok=False,
+        expected_sha256=chapter.sha256,
+    )
+    if not os.path.exists(chapter.path):
+        result.error = "File missing"
+        return result
+    result.actual_sha256, result.size = hash_file(chapter.path)
+    if result.size != chapter.size:
+        result.error = f"Size changed: {chapter.size} -> {result.size} bytes"
+    elif result.actual_sha256 != chapter.sha256:
+        result.error = "Checksum mismatch"
+    else:
+        result.ok = True
+    return result
+
+
+@router.post("/{download_id}/verify", response_model=VerifyResponse)
+async def verify_download(
+    download_id: int,
+    _user: Annotated[str, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """Re-hash a download's chapter files and compare them with the hashes stored at download time."""
+    result = await db.execute(select(Download).where(Download.id == download_id))
+    item = result.scalar_one_or_none()
+
+    if not item:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Download not found")
+
+    result = await db.execute(
+        select(ChapterFile)
+        .where(ChapterFile.book_dir == item.file_path)
+        .order_by(ChapterFile.chapter)
+    )
+    chapters = result.scalars().all()
+    if not chapters:
+        return VerifyResponse(
+            download_id=download_id,
+            ok=False,
+            chapters=[],
+            error="No stored hashes for this download",
+        )
+
+    loop = asyncio.get_event_loop()
+    results = []
+    for chapter in chapters:
+        results.append(await loop.run_in_executor(None, _verify_chapter, chapter))
+
+    return VerifyResponse(
+        download_id=download_id,
+        ok=all(r.ok for r in results),
+        chapters=results,
+    )
+
+
 @router.delete("/{download_id}")
 async def delete_download(
     download_id: int,
@@ -76,5 +147,6 @@ async def delete_download(
 
     await db.execute(delete(Download).where(Download.id == download_id))
     await db.commit()
+    invalidate_counts()
 
     return {"ok": True}
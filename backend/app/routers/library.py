@@ -0,0 +1,215 @@
+import os
+import time
+from datetime import datetime
+from typing import Annotated
+
+import anyio.to_thread
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import FileResponse
+from sqlalchemy import distinct, exists, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import get_current_user, sign_path, verify_signed_path
+from app.config import settings
+from app.database import async_session_maker, get_db
+from app.models import ChapterFile, Download, LibraryFile
+from app.schemas import (
+    LibraryBookResponse,
+    LibraryFileResponse,
+    LibraryFormatStats,
+    LibraryStats,
+)
+from app.services.library import library_scanner
+
+router = APIRouter()
+
+# Browsers won't play a file served as application/octet-stream
+MEDIA_TYPES = {
+    "mp3": "audio/mpeg",
+    "m4a": "audio/mp4",
+    "m4b": "audio/mp4",
+    "aac": "audio/aac",
+    "ogg": "audio/ogg",
+    "opus": "audio/ogg",
+    "flac": "audio/flac",
+    "mka": "audio/x-matroska",
+}
+
+
+@router.get("", response_model=LibraryStats)
+async def get_library_stats(
+    _user: Annotated[str, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """Totals over the files found by the last library scan."""
+    books, files, total_bytes, total_duration, average_bitrate, unreadable = (
+        await db.execute(
+            select(
+                func.count(distinct(LibraryFile.book_dir)),
+                func.count(),
+                func.coalesce(func.sum(LibraryFile.size), 0),
+                func.coalesce(func.sum(LibraryFile.duration), 0.0),
+                func.avg(LibraryFile.bitrate),
+                func.count(LibraryFile.error),
+            )
+        )
+    ).one()
+
+    result = await db.execute(
+        select(LibraryFile.format, func.count(), func.sum(LibraryFile.size)).group_by(
+            LibraryFile.format
+        )
+    )
+    formats = {
+        fmt or "unknown": LibraryFormatStats(files=count, bytes=size)
+        for fmt, count, size in result.all()
+    }
+
+    downloads = await db.scalar(select(func.count(Download.id)))
+    missing = await db.scalar(
+        select(func.count(Download.id)).where(
+            ~exists().where(LibraryFile.book_dir == Download.file_path)
+        )
+    )
+
+    return LibraryStats(
+        books=books,
+        files=files,
+        total_bytes=total_bytes,
+        total_duration_seconds=round(total_duration, 1),
+        average_bitrate=int(average_bitrate) if average_bitrate else None,
+        formats=formats,
+        unreadable_files=unreadable,
+        downloads=downloads,
+        missing_downloads=missing,
+        last_scan=library_scanner.last_scan,
+    )
+
+
+@router.post("/scan")
+async def scan_library(
+    _user: Annotated[str, Depends(get_current_user)],
+):
+    """Rescan the library now; only new or changed files are read."""
+    return await library_scanner.scan()
+
+
+async def book_files(
+    db: AsyncSession, download: Download
+) -> tuple[list[tuple[LibraryFile, int | None, bool]], list[int]]:
+    """A download's files in chapter order, and the chapters no longer on disk.
+
+    Each file comes with its chapter number (if it was downloaded as one)
+    and whether its size changed since it was verified.
+    """
+    if not download.file_path:
+        return [], []
+    result = await db.execute(
+        select(LibraryFile).where(LibraryFile.book_dir == download.file_path)
+    )
+    files = result.scalars().all()
+
+    result = await db.execute(
+        select(ChapterFile.path, ChapterFile.chapter, ChapterFile.size).where(
+            ChapterFile.book_dir == download.file_path,
+            ChapterFile.verified.is_(True),
+        )
+    )
+    chapters = {path: (chapter, size) for path, chapter, size in result.all()}
+
+    listing = []
+    for f in files:
+        chapter, size = chapters.get(f.path, (None, None))
+        listing.append((f, chapter, size is not None and size != f.size))
+    listing.sort(key=lambda entry: (entry[1] is None, entry[1] or 0, entry[0].path))
+
+    on_disk = {f.path for f in files}
+    missing = sorted({chapter for path, (chapter, _) in chapters.items() if path not in on_disk})
+    return listing, missing
+
+
+@router.get("/{download_id}", response_model=LibraryBookResponse)
+async def get_library_book(
+    download_id: int,
+    request: Request,
+    _user: Annotated[str, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """Files on disk for a download, in chapter order, with signed URLs to play them."""
+    download = await db.get(Download, download_id)
+    if not download:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Download not found")
+
+    listing, missing = await book_files(db, download)
+
+    return LibraryBookResponse(
+        download_id=download.id,
+        title=download.title,
+        path=download.file_path,
+        files=[
+            LibraryFileResponse(
+                name=os.path.basename(f.path),
+                chapter=chapter,
+                size=f.size,
+                duration=f.duration,
+                bitrate=f.bitrate,
+                format=f.format,
+                modified_at=datetime.utcfromtimestamp(f.mtime_ns / 1e9),
+                changed=changed,
+                error=f.error,
+                stream_url=sign_path(
+                    request.app.url_path_for(
+                        "stream_chapter", download_id=download.id, file_id=f.id
+                    ),
+                    settings.stream_url_ttl,
+                ),
+            )
+            for f, chapter, changed in listing
+        ],
+        total_bytes=sum(f.size for f, _, _ in listing),
+        total_duration_seconds=round(sum(f.duration or 0 for f, _, _ in listing), 1),
+        missing_chapters=missing,
+    )
+
+
+@router.api_route(
+    "/{download_id}/chapters/{file_id}", methods=["GET", "HEAD"], name="stream_chapter"
+)
+async def stream_chapter(
+    download_id: int,
+    file_id: int,
+    expires: int,
+    _user: Annotated[str, Depends(verify_signed_path)],
+):
+    """Serve one of a download's files to an audio player.
+
+    Authenticated by the signed URL from ``GET /{download_id}``, since
+    ``<audio>`` can't send the bearer token. The URL names the scanned
+    file, so it keeps pointing at the same audio across rescans.
+    ``FileResponse`` handles ranges, so players can seek, and reads the file
+    on worker threads (or hands it to servers offering ``pathsend``).
+    """
+    # Not get_db: its session would stay open for as long as the file streams
+    async with async_session_maker() as db:
+        download = await db.get(Download, download_id)
+        f = await db.get(LibraryFile, file_id)
+
+    if not download:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Download not found")
+    if not f or f.book_dir != download.file_path:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    try:
+        stat_result = await anyio.to_thread.run_sync(os.stat, f.path)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File is gone; rescan the library",
+        )
+
+    return FileResponse(
+        f.path,
+        stat_result=stat_result,
+        media_type=MEDIA_TYPES.get(f.format),
+        # Cacheable for as long as the URL is valid
+        headers={"Cache-Control": f"private, max-age={max(0, expires - int(time.time()))}"},
+    )
@@ -1,54 +1,213 @@
+import hashlib
+from datetime import datetime
 from typing import Annotated
+from urllib.parse import urlsplit
 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy import select, delete
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
+from sqlalchemy import String, delete, func, select, tuple_, type_coerce
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth import get_current_user
+from app.config import settings
 from app.database import get_db
-from app.models import QueueItem
-from app.schemas import QueueAddRequest, QueueItemResponse, QueueResponse
-from app.services.download_worker import process_queue
+from app.models import BookManifest, QueueItem
+from app.schemas import (
+    QueueAddRequest,
+    QueueDuplicate,
+    QueueItemResponse,
+    QueuePriorityUpdate,
+    QueueRejected,
+    QueueResponse,
+)
+from app.services.cancellation import cancellation_registry
+from app.services.dedup import find_duplicate_urls, normalize_url
+from app.services.pagination import InvalidCursorError, decode_cursor, encode_cursor
+from app.services.prefetch import metadata_prefetcher
+from app.services.queue_scheduler import enqueue_urls, top_priority
+from app.services.worker_supervisor import worker_supervisor
+from scrapers import get_scraper
 
 router = APIRouter()
 
 
+async def _queue_version(db: AsyncSession) -> tuple[int, datetime | None, int | None]:
+    """Changes whenever an item is added, updated or removed.
+
+    Separate subqueries so each is answered from an index rather than a
+    table scan.
+    """
+    row = await db.execute(
+        select(
+            select(func.count()).select_from(QueueItem).scalar_subquery(),
+            select(func.max(QueueItem.updated_at)).scalar_subquery(),
+            select(func.max(QueueItem.id)).scalar_subquery(),
+        )
+    )
+    return row.one()
+
+
 @router.get("", response_model=QueueResponse)
 async def get_queue(
+    request: Request,
+    response: Response,
     _user: Annotated[str, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_db)],
+    status_filter: Annotated[str | None, Query(alias="status")] = None,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = None,
+    since: datetime | None = None,
+    if_none_match: Annotated[str | None, Header()] = None,
 ):
-    result = await db.execute(
-        select(QueueItem).order_by(QueueItem.created_at.desc())
+    """List queue items newest first, optionally filtered by comma-separated statuses.
+
+    Pages are chained with ``next_cursor``. With ``since`` (a previous
+    response's ``next_since``) only items changed since then are returned,
+    oldest change first and unpaginated. Responses carry an ETag over the
+    whole queue, so polling an unchanged queue gets a bodiless 304.
+    """
+    version = await _queue_version(db)
+    etag = '"' + hashlib.sha1(f"{version}|{request.url.query}".encode()).hexdigest()[:20] + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+
+    query = select(QueueItem)
+    if status_filter:
+        query = query.where(QueueItem.status.in_(status_filter.split(",")))
+
+    next_cursor = None
+    if since:
+        query = query.where(QueueItem.updated_at >= since).order_by(
+            QueueItem.updated_at, QueueItem.id
+        )
+        items = (await db.execute(query)).scalars().all()
+    else:
+        # Stored text, as in the download history (see download_search)
+        created_at = type_coerce(QueueItem.created_at, String)
+        query = query.add_columns(created_at.label("cursor_key")).order_by(
+            QueueItem.created_at.desc(), QueueItem.id.desc()
+        )
+        if cursor:
+            try:
+                key, last_id = decode_cursor(cursor, str)
+            except InvalidCursorError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+            query = query.where(tuple_(created_at, QueueItem.id) < tuple_(key, last_id))
+        rows = (await db.execute(query.limit(limit + 1))).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].cursor_key, rows[-1][0].id)
+        items = [item for item, _ in rows]
+
+    return QueueResponse(
+        items=[QueueItemResponse.model_validate(i) for i in items],
+        next_cursor=next_cursor,
+        # Read before the items, so a change racing this request is
+        # returned again next time rather than missed
+        next_since=version[1],
+    )
+
+
+def _check_url(url: str) -> str | None:
+    """Why a URL can't be queued, or None if a scraper supports it."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return "Not a valid URL"
+    if get_scraper(url) is None:
+        return "Unsupported website"
+    return None
+
+
+async def _enqueue(
+    db: AsyncSession, lines: list[str], force: bool, priority: int, resolve: bool = False
+) -> QueueResponse:
+    urls = {}
+    rejected = []
+    duplicates = []
+    for url in lines:
+        url = url.strip()
+        if not url or url.startswith("#"):
+            continue
+        reason = _check_url(url)
+        if reason:
+            rejected.append(QueueRejected(url=url, reason=reason))
+            continue
+        normalized = normalize_url(url)
+        if normalized in urls:
+            duplicates.append(QueueDuplicate(url=url, reason="Repeated in this request"))
+        else:
+            urls[normalized] = url
+    if len(urls) > settings.import_max_urls:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many URLs (at most {settings.import_max_urls} per request)",
+        )
+
+    existing = {} if force else await find_duplicate_urls(db, list(urls))
+    duplicates += [
+        QueueDuplicate(url=urls.pop(normalized), **existing[normalized])
+        for normalized in list(urls)
+        if normalized in existing
+    ]
+
+    new_items = await enqueue_urls(db, urls, priority=priority, allow_duplicate=force)
+    await db.commit()
+
+    # Wake the background worker
+    worker_supervisor.wake()
+    if resolve:
+        metadata_prefetcher.resolve([(item.id, item.url) for item in new_items])
+
+    return QueueResponse(
+        items=[QueueItemResponse.model_validate(i) for i in new_items],
+        duplicates=duplicates,
+        rejected=rejected,
     )
-    items = result.scalars().all()
-    return QueueResponse(items=[QueueItemResponse.model_validate(i) for i in items])
 
 
 @router.post("", response_model=QueueResponse)
 async def add_to_queue(
     request: QueueAddRequest,
-    background_tasks: BackgroundTasks,
     _user: Annotated[str, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
-    new_items = []
-    for url in request.urls:
-        url = url.strip()
-        if not url:
-            continue
-        item = QueueItem(url=url, status="pending")
-        db.add(item)
-        new_items.append(item)
+    return await _enqueue(db, request.urls, request.force, request.priority)
 
-    await db.commit()
-    for item in new_items:
-        await db.refresh(item)
 
-    # Trigger background processing
-    background_tasks.add_task(process_queue)
+@router.post("/import", response_model=QueueResponse)
+async def import_to_queue(
+    request: QueueAddRequest,
+    _user: Annotated[str, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """Queue a reading list; titles and chapter lists are looked up in the background."""
+    return await _enqueue(db, request.urls, request.force, request.priority, resolve=True)
 
-    return QueueResponse(items=[QueueItemResponse.model_validate(i) for i in new_items])
+
+@router.post("/import/file", response_model=QueueResponse)
+async def import_file_to_queue(
+    file: Annotated[UploadFile, File()],
+    _user: Annotated[str, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    force: Annotated[bool, Form()] = False,
+    priority: Annotated[int, Form()] = 0,
+):
+    """Like ``/import``, from a text file with one URL per line (``#`` starts a comment)."""
+    content = (await file.read()).decode("utf-8", errors="replace")
+    return await _enqueue(db, content.splitlines(), force, priority, resolve=True)
 
 
 @router.delete("/{item_id}")
@@ -63,21 +222,61 @@ async def remove_from_queue(
     if not item:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
 
-    if item.status == "downloading":
-        # Mark as cancelled so worker stops
+    if item.status in ("fetching", "downloading"):
+        # Mark as cancelled and stop the worker immediately (even mid-chapter)
         item.status = "cancelled"
         await db.commit()
+        cancellation_registry.cancel(item_id)
     else:
         await db.execute(delete(QueueItem).where(QueueItem.id == item_id))
+        await db.execute(delete(BookManifest).where(BookManifest.queue_id == item_id))
         await db.commit()
+        metadata_prefetcher.discard(item_id)
 
     return {"ok": True}
 
 
+async def _get_pending_item(db: AsyncSession, item_id: int) -> QueueItem:
+    item = await db.get(QueueItem, item_id)
+    if not item:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
+    if item.status != "pending":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Can only reorder pending items",
+        )
+    return item
+
+
+@router.patch("/{item_id}", response_model=QueueItemResponse)
+async def set_priority(
+    item_id: int,
+    request: QueuePriorityUpdate,
+    _user: Annotated[str, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    item = await _get_pending_item(db, item_id)
+    item.priority = request.priority
+    await db.commit()
+    return QueueItemResponse.model_validate(item)
+
+
+@router.post("/{item_id}/prioritize", response_model=QueueItemResponse)
+async def download_next(
+    item_id: int,
+    _user: Annotated[str, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+):
+    """Move a pending item to the front of the queue."""
+    item = await _get_pending_item(db, item_id)
+    item.priority = await top_priority(db) + 1
+    await db.commit()
+    return QueueItemResponse.model_validate(item)
+
+
 @router.post("/{item_id}/retry")
 async def retry_download(
     item_id: int,
-    background_tasks: BackgroundTasks,
     _user: Annotated[str, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_db)],
 ):
@@ -96,9 +295,12 @@ async def retry_download(
     item.status = "pending"
     item.error_message = None
     item.current_chapter = 0
+    item.attempts = 0
+    # An explicit retry overrides the duplicate-book check
+    item.allow_duplicate = True
     await db.commit()
 
-    # Trigger background processing
-    background_tasks.add_task(process_queue)
+    # Wake the background worker
+    worker_supervisor.wake()
 
     return {"ok": True}
@@ -1,11 +1,16 @@
-import asyncio
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header
 from sse_starlette.sse import EventSourceResponse
 
 from app.auth import get_current_user
+from app.config import settings
+from app.services.adaptive_concurrency import segment_limiter
+from app.services.bandwidth import bandwidth_scheduler
+from app.services.leader import leader_election
 from app.services.progress_tracker import progress_tracker
+from app.services.retention import retention_job
+from app.services.worker_sync import worker_metrics
 
 router = APIRouter()
 
@@ -13,21 +18,48 @@ router = APIRouter()
 @router.get("/stream")
 async def status_stream(
     _user: Annotated[str, Depends(get_current_user)],
+    last_event_id: Annotated[str | None, Header()] = None,
 ):
+    """Live queue events: a snapshot of every item first, or only the missed
+    events when reconnecting with ``Last-Event-ID``."""
+    try:
+        resume_from = int(last_event_id) if last_event_id else None
+    except ValueError:
+        resume_from = None
+
     async def event_generator():
-        queue = await progress_tracker.subscribe()
+        subscriber = await progress_tracker.subscribe(resume_from)
         try:
             while True:
-                try:
-                    event = await asyncio.wait_for(queue.get(), timeout=30.0)
-                    yield {
-                        "event": event["type"],
-                        "data": event["data"],
-                    }
-                except asyncio.TimeoutError:
+                event = await subscriber.get(timeout=30.0)
+                if subscriber.evicted:
+                    # Too far behind; the client reconnects and starts fresh
+                    break
+                if event is None:
                     # Send keepalive
                     yield {"event": "ping", "data": ""}
+                    continue
+                yield {
+                    "id": str(event["id"]),
+                    "event": event["type"],
+                    "data": event["data"],
+                }
         finally:
-            progress_tracker.unsubscribe(queue)
+            progress_tracker.unsubscribe(subscriber)
 
     return EventSourceResponse(event_generator())
+
+
+@router.get("/metrics")
+async def get_metrics(
+    _user: Annotated[str, Depends(get_current_user)],
+):
+    metrics = {}
+    if settings.run_embedded_worker and leader_election.is_leader:
+        metrics["segment_concurrency"] = segment_limiter.snapshot()
+        metrics["bandwidth"] = bandwidth_scheduler.snapshot()
+    metrics["events"] = progress_tracker.metrics()
+    metrics["retention"] = retention_job.last_report
+    # Separate worker processes report their own limiter and scheduler
+    metrics["workers"] = await worker_metrics()
+    return metrics
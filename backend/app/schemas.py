@@ -1,5 +1,5 @@
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 # Auth
@@ -37,6 +37,15 @@ class SearchResponse(BaseModel):
 # Queue
 class QueueAddRequest(BaseModel):
     urls: list[str]
+    force: bool = False  # enqueue even if already queued or downloaded
+    priority: int = 0  # higher runs first
+
+
+class QueueDuplicate(BaseModel):
+    url: str
+    reason: str
+    queue_id: int | None = None
+    download_id: int | None = None
 
 
 class QueueItemResponse(BaseModel):
@@ -48,19 +57,35 @@ class QueueItemResponse(BaseModel):
     site: str | None
     cover_url: str | None
     status: str
+    priority: int = 0
     current_chapter: int
     total_chapters: int
     error_message: str | None
     created_at: datetime
     started_at: datetime | None
     completed_at: datetime | None
+    updated_at: datetime | None = None
 
     class Config:
         from_attributes = True
 
 
+class QueuePriorityUpdate(BaseModel):
+    priority: int
+
+
+class QueueRejected(BaseModel):
+    url: str
+    reason: str
+
+
 class QueueResponse(BaseModel):
     items: list[QueueItemResponse]
+    duplicates: list[QueueDuplicate] = []
+    rejected: list[QueueRejected] = []
+    next_cursor: str | None = None
+    # Pass back as ``since`` to get only the items changed after this response
+    next_since: datetime | None = None
 
 
 # Downloads
@@ -86,6 +111,88 @@ class DownloadsListResponse(BaseModel):
     total: int
     page: int
     limit: int
+    next_cursor: str | None = None
+
+
+class ChapterVerifyResult(BaseModel):
+    chapter: int
+    path: str
+    ok: bool
+    error: str | None = None
+    size: int | None = None
+    expected_sha256: str
+    actual_sha256: str | None = None
+
+
+class VerifyResponse(BaseModel):
+    download_id: int
+    ok: bool
+    chapters: list[ChapterVerifyResult]
+    error: str | None = None
+
+
+# Library
+class LibraryFormatStats(BaseModel):
+    files: int
+    bytes: int
+
+
+class LibraryStats(BaseModel):
+    books: int
+    files: int
+    total_bytes: int
+    total_duration_seconds: float
+    average_bitrate: int | None
+    formats: dict[str, LibraryFormatStats]
+    unreadable_files: int
+    downloads: int
+    # Downloads whose directory has no audio files left
+    missing_downloads: int
+    last_scan: dict | None = None
+
+
+class LibraryFileResponse(BaseModel):
+    name: str
+    chapter: int | None
+    size: int
+    duration: float | None
+    bitrate: int | None
+    format: str | None
+    modified_at: datetime
+    # Size differs from the file verified at download time
+    changed: bool = False
+    error: str | None = None
+    # Signed, short-lived URL for playing the file (see GET /api/library/{id}/chapters/{n})
+    stream_url: str | None = None
+
+
+class LibraryBookResponse(BaseModel):
+    download_id: int
+    title: str
+    path: str | None
+    files: list[LibraryFileResponse]
+    total_bytes: int
+    total_duration_seconds: float
+    missing_chapters: list[int]
+
+
+# Bandwidth
+class BandwidthConfig(BaseModel):
+    global_limit_kib: int = Field(0, ge=0)
+    site_limits_kib: dict[str, int] = {}
+    full_speed_windows: list[str] = []
+
+
+class BandwidthItem(BaseModel):
+    queue_id: int
+    site: str | None
+    bytes: int
+    rate_limit_kib: int
+
+
+class BandwidthStatus(BandwidthConfig):
+    full_speed_now: bool
+    active_items: list[BandwidthItem]
 
 
 # SSE Events
@@ -0,0 +1,158 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from app.config import settings
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit for segment fetches, shared by every active book.
+
+    Each completed request feeds back its latency, size and outcome. While
+    requests succeed and latency stays close to the observed baseline, the
+    limit grows by roughly one slot per round trip; a throttled or failed
+    request halves it (at most once per cooldown window).
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        latency_tolerance: float = 2.0,
+        decrease_factor: float = 0.5,
+        cooldown: float = 2.0,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self._latency_tolerance = latency_tolerance
+        self._decrease_factor = decrease_factor
+        self._cooldown = cooldown
+
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._last_decrease = 0.0
+
+        # Smoothed observations (EWMA)
+        self._latency_ewma: float | None = None
+        self._latency_min: float | None = None
+        self._throughput_ewma: float | None = None
+        self._error_rate = 0.0
+
+        # Counters
+        self._requests = 0
+        self._errors = 0
+        self._throttled = 0
+        self._bytes = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(
+        self,
+        latency: float,
+        nbytes: int = 0,
+        ok: bool = True,
+        throttled: bool = False,
+    ):
+        with self._cond:
+            self._in_flight -= 1
+            self._requests += 1
+            self._record(latency, nbytes, ok, throttled)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """Hold one slot; call the yielded ``done(nbytes, ok, throttled)`` before exit."""
+        self.acquire()
+        started = time.monotonic()
+        outcome = {"nbytes": 0, "ok": False, "throttled": False}
+
+        def done(nbytes: int = 0, ok: bool = True, throttled: bool = False):
+            outcome.update(nbytes=nbytes, ok=ok, throttled=throttled)
+
+        try:
+            yield done
+        finally:
+            self.release(time.monotonic() - started, **outcome)
+
+    def _record(self, latency: float, nbytes: int, ok: bool, throttled: bool):
+        alpha = 0.2
+        failed = throttled or not ok
+        self._error_rate = (1 - alpha) * self._error_rate + alpha * (1.0 if failed else 0.0)
+
+        if failed:
+            self._errors += 1
+            if throttled:
+                self._throttled += 1
+            self._decrease()
+            return
+
+        self._bytes += nbytes
+        if self._latency_ewma is None:
+            self._latency_ewma = latency
+        else:
+            self._latency_ewma = (1 - alpha) * self._latency_ewma + alpha * latency
+        if self._latency_min is None or latency < self._latency_min:
+            self._latency_min = latency
+        if latency > 0 and nbytes:
+            # Per-request rate scaled by the concurrency it ran alongside
+            rate = nbytes / latency * (self._in_flight + 1)
+            if self._throughput_ewma is None:
+                self._throughput_ewma = rate
+            else:
+                self._throughput_ewma = (1 - alpha) * self._throughput_ewma + alpha * rate
+
+        # Latency well above the baseline means the server (or our link) is
+        # queueing requests: adding concurrency would only add delay.
+        if self._latency_ewma > self._latency_min * self._latency_tolerance:
+            return
+        self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_decrease < self._cooldown:
+            return
+        self._last_decrease = now
+        self._limit = max(float(self.min_limit), self._limit * self._decrease_factor)
+        # Let the baseline re-learn after backing off
+        self._latency_min = self._latency_ewma
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "in_flight": self._in_flight,
+                "latency_ewma_ms": round(self._latency_ewma * 1000, 1)
+                if self._latency_ewma is not None
+                else None,
+                "latency_min_ms": round(self._latency_min * 1000, 1)
+                if self._latency_min is not None
+                else None,
+                "throughput_bps": int(self._throughput_ewma)
+                if self._throughput_ewma is not None
+                else None,
+                "error_rate": round(self._error_rate, 3),
+                "requests": self._requests,
+                "errors": self._errors,
+                "throttled": self._throttled,
+                "bytes": self._bytes,
+            }
+
+
+# Global singleton shared across all concurrently downloading books
+segment_limiter = AdaptiveConcurrencyLimiter(
+    initial=settings.segment_concurrency_initial,
+    min_limit=settings.segment_concurrency_min,
+    max_limit=settings.segment_concurrency_max,
+)
@@ -0,0 +1,199 @@
+import threading
+import time
+from datetime import datetime
+
+from app.config import settings
+
+# An item counts towards fair sharing while it has transferred recently
+ACTIVE_WINDOW = 2.0
+
+
+class TokenBucket:
+    """Byte-rate token bucket. A rate of 0 means unlimited.
+
+    Callers consume first and are told how long to wait, so one large read
+    can't be starved by a stream of small ones.
+    """
+
+    def __init__(self, rate: float, burst_seconds: float = 1.0):
+        self.rate = rate
+        self.burst_seconds = burst_seconds
+        self._tokens = rate * burst_seconds
+        self._updated = time.monotonic()
+
+    def set_rate(self, rate: float):
+        self._refill()
+        self.rate = rate
+        self._tokens = min(self._tokens, rate * self.burst_seconds)
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate > 0:
+            self._tokens = min(
+                self.rate * self.burst_seconds,
+                self._tokens + (now - self._updated) * self.rate,
+            )
+        self._updated = now
+
+    def consume(self, nbytes: int) -> float:
+        """Take ``nbytes`` and return the number of seconds to wait before sending more."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        self._tokens -= nbytes
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+
+def _parse_window(window: str) -> tuple[int, int]:
+    """Parse ``"HH:MM-HH:MM"`` into minutes since midnight."""
+    def to_minutes(value: str) -> int:
+        hours, minutes = value.strip().split(":")
+        if not (0 <= int(hours) < 24 and 0 <= int(minutes) < 60):
+            raise ValueError(f"Invalid time: {value}")
+        return int(hours) * 60 + int(minutes)
+
+    start, end = window.split("-", 1)
+    return to_minutes(start), to_minutes(end)
+
+
+class BandwidthScheduler:
+    """Global and per-site download rate limits with fair sharing between queue items.
+
+    Every active queue item gets an equal share of the global limit (and of
+    its site's limit); items that have gone quiet stop counting, so their
+    share goes back to the others. During full-speed windows all limits are
+    lifted.
+    """
+
+    def __init__(
+        self,
+        global_limit_kib: int = 0,
+        site_limits_kib: dict[str, int] | None = None,
+        full_speed_windows: list[str] | None = None,
+    ):
+        self._lock = threading.Lock()
+        self._global = TokenBucket(0)
+        self._sites: dict[str, TokenBucket] = {}
+        self._items: dict[int, dict] = {}
+        self.configure(global_limit_kib, site_limits_kib or {}, full_speed_windows or [])
+
+    def configure(
+        self,
+        global_limit_kib: int,
+        site_limits_kib: dict[str, int],
+        full_speed_windows: list[str],
+    ):
+        windows = [_parse_window(w) for w in full_speed_windows]
+        with self._lock:
+            self.global_limit_kib = global_limit_kib
+            self.site_limits_kib = dict(site_limits_kib)
+            self.full_speed_windows = list(full_speed_windows)
+            self._windows = windows
+            self._global.set_rate(global_limit_kib * 1024)
+            for site, bucket in self._sites.items():
+                bucket.set_rate(self.site_limits_kib.get(site, 0) * 1024)
+
+    def register(self, queue_id: int, site: str | None):
+        with self._lock:
+            site = site or ""
+            if site not in self._sites:
+                self._sites[site] = TokenBucket(self.site_limits_kib.get(site, 0) * 1024)
+            self._items[queue_id] = {
+                "site": site,
+                "bucket": TokenBucket(0),
+                "last_active": 0.0,
+                "bytes": 0,
+            }
+
+    def unregister(self, queue_id: int):
+        with self._lock:
+            self._items.pop(queue_id, None)
+
+    def in_full_speed_window(self, now: datetime | None = None) -> bool:
+        now = now or datetime.now()
+        minute = now.hour * 60 + now.minute
+        for start, end in self._windows:
+            if start <= end:
+                if start <= minute < end:
+                    return True
+            elif minute >= start or minute < end:
+                # Window wraps past midnight
+                return True
+        return False
+
+    def is_limited(self, site: str | None) -> bool:
+        """Whether downloads from ``site`` are currently rate limited."""
+        if self.in_full_speed_window():
+            return False
+        return self.global_limit_kib > 0 or self.site_limits_kib.get(site or "", 0) > 0
+
+    def _fair_rate(self, item: dict, now: float) -> float:
+        active = [
+            i for i in self._items.values()
+            if now - i["last_active"] < ACTIVE_WINDOW or i is item
+        ]
+        rates = []
+        if self.global_limit_kib > 0:
+            rates.append(self.global_limit_kib * 1024 / len(active))
+        site_limit = self.site_limits_kib.get(item["site"], 0)
+        if site_limit > 0:
+            same_site = [i for i in active if i["site"] == item["site"]]
+            rates.append(site_limit * 1024 / len(same_site))
+        return min(rates) if rates else 0
+
+    def consume(self, queue_id: int, nbytes: int, cancel_event: threading.Event | None = None):
+        """Account ``nbytes`` for a queue item, sleeping the calling thread as needed.
+
+        Setting ``cancel_event`` cuts the wait short.
+        """
+        with self._lock:
+            item = self._items.get(queue_id)
+            now = time.monotonic()
+            if item is None:
+                return
+            item["bytes"] += nbytes
+            item["last_active"] = now
+            if self.in_full_speed_window():
+                return
+
+            item["bucket"].set_rate(self._fair_rate(item, now))
+            wait = max(
+                self._global.consume(nbytes),
+                self._sites[item["site"]].consume(nbytes),
+                item["bucket"].consume(nbytes),
+            )
+        if wait <= 0:
+            return
+        if cancel_event:
+            cancel_event.wait(wait)
+        else:
+            time.sleep(wait)
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "global_limit_kib": self.global_limit_kib,
+                "site_limits_kib": dict(self.site_limits_kib),
+                "full_speed_windows": list(self.full_speed_windows),
+                "full_speed_now": self.in_full_speed_window(),
+                "active_items": [
+                    {
+                        "queue_id": queue_id,
+                        "site": item["site"] or None,
+                        "bytes": item["bytes"],
+                        "rate_limit_kib": int(self._fair_rate(item, now) / 1024),
+                    }
+                    for queue_id, item in self._items.items()
+                ],
+            }
+
+
+# Global singleton
+bandwidth_scheduler = BandwidthScheduler(
+    global_limit_kib=settings.bandwidth_global_limit_kib,
+    site_limits_kib=settings.bandwidth_site_limits_kib,
+    full_speed_windows=settings.bandwidth_full_speed_windows,
+)
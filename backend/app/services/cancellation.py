@@ -0,0 +1,61 @@
+import threading
+
+
+class DownloadCancelled(Exception):
+    pass
+
+
+class CancellationRegistry:
+    """In-process cancellation flags for running downloads, keyed by queue id.
+
+    Flags are ``threading.Event``s so the download threads can check them
+    between chunks as cheaply as the event loop can.
+    """
+
+    def __init__(self):
+        self._events: dict[int, threading.Event] = {}
+        self._reasons: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def register(self, queue_id: int) -> threading.Event:
+        with self._lock:
+            event = self._events.setdefault(queue_id, threading.Event())
+            event.clear()
+            self._reasons.pop(queue_id, None)
+            return event
+
+    def unregister(self, queue_id: int):
+        with self._lock:
+            self._events.pop(queue_id, None)
+            self._reasons.pop(queue_id, None)
+
+    def cancel(self, queue_id: int, reason: str = "cancelled") -> bool:
+        """Signal a running download to stop; returns False if it isn't running here.
+
+        ``reason`` is ``"cancelled"`` (by the user), ``"stalled"`` (watchdog),
+        ``"lease_lost"`` (another worker took the item over) or ``"shutdown"``.
+        """
+        with self._lock:
+            event = self._events.get(queue_id)
+            if event is None:
+                return False
+            self._reasons.setdefault(queue_id, reason)
+        event.set()
+        return True
+
+    def cancel_all(self, reason: str):
+        with self._lock:
+            queue_ids = list(self._events)
+        for queue_id in queue_ids:
+            self.cancel(queue_id, reason)
+
+    def reason(self, queue_id: int) -> str | None:
+        return self._reasons.get(queue_id)
+
+    def is_cancelled(self, queue_id: int) -> bool:
+        event = self._events.get(queue_id)
+        return event is not None and event.is_set()
+
+
+# Global singleton
+cancellation_registry = CancellationRegistry()
@@ -0,0 +1,246 @@
+import hashlib
+import os
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import ChapterFile, Download, QueueItem
+from app.services.tagging import strip_leading_id3
+
+ACTIVE_STATUSES = ("pending", "fetching", "downloading")
+
+# Query parameters that never change which book a URL points at
+_TRACKING_PARAMS = re.compile(r"^(utm_.*|fbclid|gclid|ref)$")
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a book URL: no scheme, www., tracking params or trailing slash."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    host = re.sub(r":(80|443)$", "", host)
+    path = re.sub(r"/+", "/", parts.path).rstrip("/")
+    query = sorted(
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not _TRACKING_PARAMS.match(k)
+    )
+    normalized = f"{host}{path}"
+    if query:
+        normalized += f"?{urlencode(query)}"
+    return normalized
+
+
+def title_key(title: str | None) -> str | None:
+    """Case/punctuation-insensitive key used to match the same book across sites."""
+    if not title:
+        return None
+    key = re.sub(r"\baudiobook\b", " ", title.lower())
+    key = re.sub(r"[^a-z0-9]+", " ", key).strip()
+    return key or None
+
+
+def authors_conflict(a: str | None, b: str | None) -> bool:
+    """Both authors are known and differ."""
+    return bool(a and b) and title_key(a) != title_key(b)
+
+
+def same_book(
+    author: str | None, other_author: str | None, chapters: int, other_chapters: int
+) -> bool:
+    """Whether two books with the same title key are the same book.
+
+    Most mirror sites don't expose the author; without both authors, an
+    equal chapter count has to vouch for it instead.
+    """
+    if author and other_author:
+        return not authors_conflict(author, other_author)
+    return chapters > 0 and chapters == other_chapters
+
+
+async def find_duplicate_urls(
+    db: AsyncSession, normalized_urls: list[str]
+) -> dict[str, dict]:
+    """Map each already-known normalized URL to the queue item or download holding it."""
+    if not normalized_urls:
+        return {}
+
+    duplicates: dict[str, dict] = {}
+    result = await db.execute(
+        select(Download.id, Download.normalized_url).where(
+            Download.normalized_url.in_(normalized_urls)
+        )
+    )
+    for download_id, normalized in result.all():
+        duplicates[normalized] = {
+            "reason": "Already downloaded",
+            "download_id": download_id,
+        }
+
+    result = await db.execute(
+        select(QueueItem.id, QueueItem.normalized_url, QueueItem.status).where(
+            QueueItem.normalized_url.in_(normalized_urls),
+            QueueItem.status.in_(ACTIVE_STATUSES),
+        )
+    )
+    for queue_id, normalized, item_status in result.all():
+        duplicates.setdefault(
+            normalized,
+            {"reason": f"Already in queue ({item_status})", "queue_id": queue_id},
+        )
+    return duplicates
+
+
+async def find_duplicate_book(
+    db: AsyncSession, queue_id: int, title: str | None, author: str | None, chapters: int
+) -> str | None:
+    """Describe an existing download or in-progress item for the same book (see ``same_book``)."""
+    key = title_key(title)
+    if not key:
+        return None
+
+    result = await db.execute(
+        select(Download.id, Download.author, Download.chapters_total).where(
+            Download.title_key == key
+        )
+    )
+    for download_id, other_author, other_chapters in result.all():
+        if same_book(author, other_author, chapters, other_chapters):
+            return f"already downloaded (download #{download_id})"
+
+    result = await db.execute(
+        select(QueueItem.id, QueueItem.author, QueueItem.total_chapters).where(
+            QueueItem.title_key == key,
+            QueueItem.status.in_(("fetching", "downloading")),
+            QueueItem.id != queue_id,
+        )
+    )
+    for other_id, other_author, other_chapters in result.all():
+        if same_book(author, other_author, chapters, other_chapters):
+            return f"already downloading (queue item #{other_id})"
+    return None
+
+
+async def backfill_dedup_keys(db: AsyncSession):
+    """Fill dedup columns for rows created before they existed."""
+    for model in (QueueItem, Download):
+        result = await db.execute(
+            select(model.id, model.url, model.title).where(
+                model.normalized_url.is_(None)
+            )
+        )
+        for row_id, url, title in result.all():
+            await db.execute(
+                update(model)
+                .where(model.id == row_id)
+                .values(normalized_url=normalize_url(url), title_key=title_key(title))
+            )
+    await db.commit()
+
+
+def hash_file(path: str) -> tuple[str, int]:
+    """SHA-256 and size of a file."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def hash_audio(path: str) -> str:
+    """SHA-256 of a file's audio, skipping the leading ID3v2 tag.
+
+    The tag carries the book title, track number and cover, so the same
+    chapter saved for two books (or from two mirrors) only matches on this.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in strip_leading_id3(iter(lambda: f.read(1024 * 1024), b"")):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _replace_with_link(source: str, target: str) -> bool:
+    """Atomically replace ``target`` with a hard link to ``source``."""
+    temp = target + ".link"
+    try:
+        if os.path.exists(temp):
+            os.remove(temp)
+        os.link(source, temp)
+        os.replace(temp, target)
+        return True
+    except OSError as e:
+        # Different filesystems, or links unsupported: keep the copy
+        print(f"Could not hard-link {target} to {source}: {e}")
+        if os.path.exists(temp):
+            os.remove(temp)
+        return False
+
+
+async def link_duplicate_chapter(
+    db: AsyncSession, path: str, sha256: str, audio_sha256: str
+) -> str | None:
+    """Replace a chapter with a hard link to an identical file stored elsewhere.
+
+    The audio hash finds candidates; only a file whose tag matches too (the
+    whole file hashes the same) qualifies, since a link shares the tag.
+    Returns the linked path, if any.
+    """
+    result = await db.execute(
+        select(ChapterFile.path, ChapterFile.size).where(
+            ChapterFile.audio_sha256 == audio_sha256,
+            ChapterFile.sha256 == sha256,
+            ChapterFile.path != path,
+        )
+    )
+    for existing, size in result.all():
+        # Skip files changed since they were hashed
+        if not os.path.exists(existing) or os.path.getsize(existing) != size:
+            continue
+        if os.path.samefile(existing, path) or _replace_with_link(existing, path):
+            return existing
+    return None
+
+
+async def save_chapter_files(db: AsyncSession, records: list[dict]):
+    """Store chapter verification results, replacing older records for the same paths.
+
+    Paths are stored normalized, as the library scanner stores them. Leaves
+    committing to the caller.
+    """
+    paths = [os.path.normpath(r["path"]) for r in records]
+    await db.execute(delete(ChapterFile).where(ChapterFile.path.in_(paths)))
+    db.add_all([
+        ChapterFile(
+            queue_id=r["queue_id"],
+            chapter=r["chapter"],
+            path=path,
+            book_dir=os.path.dirname(path),
+            size=r["size"],
+            sha256=r["sha256"],
+            audio_sha256=r.get("audio_sha256"),
+            expected_size=r.get("expected_size"),
+            format=r.get("format"),
+            verified=r["ok"],
+            error=r.get("error"),
+        )
+        for path, r in zip(paths, records)
+    ])
+
+
+async def verified_chapter_sizes(db: AsyncSession, paths: list[str]) -> dict[str, int]:
+    """Paths (among ``paths``) with a verified chapter record, mapped to their size."""
+    if not paths:
+        return {}
+    result = await db.execute(
+        select(ChapterFile.path, ChapterFile.size).where(
+            ChapterFile.path.in_(paths),
+            ChapterFile.verified.is_(True),
+        )
+    )
+    return dict(result.all())
@@ -0,0 +1,92 @@
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from app.config import settings
+
+# Rough size of FFmpeg's -q:a 2 MP3 output, used when only durations are known
+ESTIMATED_BYTES_PER_SECOND = 24_000
+
+MB = 1024 * 1024
+
+
+# requests.Session isn't thread-safe: each HEAD thread keeps its own
+_sessions = threading.local()
+
+
+class InsufficientSpaceError(Exception):
+    pass
+
+
+def _session() -> requests.Session:
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        session = _sessions.session = requests.Session()
+    return session
+
+
+def _content_length(url: str, headers: dict) -> int | None:
+    try:
+        r = _session().head(url, headers=headers, allow_redirects=True, timeout=(10, 30))
+        if r.ok and r.headers.get("Content-Length"):
+            return int(r.headers["Content-Length"])
+    except (requests.exceptions.RequestException, ValueError):
+        pass
+    return None
+
+
+def _chapter_length(chapter: dict, headers: dict) -> int | None:
+    if not chapter.get("content_length"):
+        chapter["content_length"] = _content_length(chapter["url"], headers)
+    return chapter["content_length"]
+
+
+def chapter_sizes(chapters: list[dict], headers: dict, site: str | None) -> list[int | None]:
+    """Best-effort byte size of each chapter, from HEAD requests or durations.
+
+    Lengths from HEAD requests are kept in the chapter's ``content_length``
+    (and so in the manifest); chapters that already have one aren't asked again.
+    """
+    if site == "tokybook.com":
+        return [
+            int(float(c["duration"]) * ESTIMATED_BYTES_PER_SECOND) if c.get("duration") else None
+            for c in chapters
+        ]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        return list(executor.map(lambda c: _chapter_length(c, headers), chapters))
+
+
+def fill_estimates(sizes: list[int | None]) -> list[int]:
+    """Sizes with unknown ones filled with the average of the known ones (0 if none are)."""
+    known = [s for s in sizes if s]
+    average = sum(known) // len(known) if known else 0
+    return [s if s else average for s in sizes]
+
+
+def estimate_total(sizes: list[int | None]) -> int:
+    """Sum of sizes, filling unknown ones with the average of the known ones."""
+    return sum(fill_estimates(sizes))
+
+
+def ensure_free_space(path: str, needed: int):
+    """Raise ``InsufficientSpaceError`` if writing ``needed`` bytes would eat into the reserve."""
+    free = shutil.disk_usage(path).free
+    reserve = settings.min_free_space_mb * MB
+    if free - needed < reserve:
+        raise InsufficientSpaceError(
+            f"Insufficient disk space: book needs ~{needed // MB} MB, "
+            f"{free // MB} MB free (keeping {settings.min_free_space_mb} MB in reserve)"
+        )
+
+
+def preallocate(f, size: int):
+    """Reserve ``size`` bytes for an open file to reduce fragmentation, if supported."""
+    if not settings.preallocate_chapters or size <= 0 or not hasattr(os, "posix_fallocate"):
+        return
+    try:
+        os.posix_fallocate(f.fileno(), 0, size)
+    except OSError:
+        pass
@@ -0,0 +1,124 @@
+import re
+import time
+from collections import OrderedDict
+
+from sqlalchemy import String, column, func, literal_column, select, table, tuple_, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Download
+from app.services.pagination import decode_cursor, encode_cursor
+
+# Full-text index over downloads, kept in sync by triggers (see database.py)
+downloads_fts = table("downloads_fts", column("rowid"))
+
+# bm25 weights for the title, author and narrator columns
+RANK_WEIGHTS = (10.0, 5.0, 2.0)
+
+# How long a total count is reused while no download has been added
+COUNT_TTL = 60.0
+
+# Searches whose counts are kept; the least recently used one goes first
+COUNT_CACHE_SIZE = 256
+
+_count_cache: OrderedDict[str | None, tuple[int | None, float, int]] = OrderedDict()
+
+
+def fts_query(search: str | None) -> str | None:
+    """FTS5 query matching every word of ``search`` as a prefix, or None if it has no words."""
+    words = re.findall(r"\w+", search or "")
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def invalidate_counts():
+    _count_cache.clear()
+
+
+async def count_downloads(db: AsyncSession, match: str | None) -> int:
+    """Total matching downloads, cached until a download is added or ``COUNT_TTL`` passes.
+
+    Deletes don't change ``max(id)``, so callers removing downloads should
+    call ``invalidate_counts``. Only the ``COUNT_CACHE_SIZE`` most recently
+    used searches stay cached.
+    """
+    max_id = await db.scalar(select(func.max(Download.id)))
+    cached = _count_cache.get(match)
+    if cached and cached[0] == max_id and cached[1] > time.monotonic():
+        _count_cache.move_to_end(match)
+        return cached[2]
+
+    if match:
+        query = (
+            select(func.count())
+            .select_from(downloads_fts)
+            .where(literal_column("downloads_fts").op("MATCH")(match))
+        )
+    else:
+        query = select(func.count(Download.id))
+    total = await db.scalar(query) or 0
+    _count_cache[match] = (max_id, time.monotonic() + COUNT_TTL, total)
+    _count_cache.move_to_end(match)
+    if len(_count_cache) > COUNT_CACHE_SIZE:
+        _count_cache.popitem(last=False)
+    return total
+
+
+async def list_downloads(
+    db: AsyncSession,
+    limit: int,
+    match: str | None = None,
+    cursor: str | None = None,
+    offset: int = 0,
+) -> tuple[list[Download], str | None]:
+    """One page of downloads and the cursor for the next one.
+
+    Without ``match`` downloads are listed newest first, keyed on
+    ``(completed_at, id)``; with it they are ranked by bm25, keyed on
+    ``(score, id)``. Browsing walks the ``completed_at`` index and searches
+    only touch matching rows, so a page costs the same however deep it is.
+    ``offset`` is only honoured without a cursor, for clients still paging
+    by number.
+    """
+    if match:
+        scores = (
+            select(
+                downloads_fts.c.rowid.label("id"),
+                func.bm25(literal_column("downloads_fts"), *RANK_WEIGHTS).label("score"),
+            )
+            .where(literal_column("downloads_fts").op("MATCH")(match))
+            .subquery()
+        )
+        query = (
+            select(Download, scores.c.score)
+            .join(scores, scores.c.id == Download.id)
+            .order_by(scores.c.score, Download.id)
+        )
+        if cursor:
+            score, last_id = decode_cursor(cursor, (int, float))
+            query = query.where(tuple_(scores.c.score, Download.id) > tuple_(score, last_id))
+    else:
+        # Compare the stored text itself: rows written by CURRENT_TIMESTAMP
+        # and by Python datetimes differ in precision, and a bound datetime
+        # would never equal the former
+        completed_at = type_coerce(Download.completed_at, String)
+        query = select(Download, completed_at.label("cursor_key")).order_by(
+            Download.completed_at.desc(), Download.id.desc()
+        )
+        if cursor:
+            key, last_id = decode_cursor(cursor, str)
+            # A row value comparison, unlike the equivalent OR, lets SQLite
+            # seek straight to the cursor in the index
+            query = query.where(tuple_(completed_at, Download.id) < tuple_(key, last_id))
+
+    if not cursor and offset:
+        query = query.offset(offset)
+    # One extra row tells whether there is a next page
+    rows = (await db.execute(query.limit(limit + 1))).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last, key = rows[-1]
+        next_cursor = encode_cursor(key, last.id)
+    return [download for download, _ in rows], next_cursor
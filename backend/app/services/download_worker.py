@@ -1,29 +1,56 @@
 import asyncio
+import functools
 import os
 import re
 import subprocess
+import threading
 import time
 from datetime import datetime
 from http.client import IncompleteRead
 
 import requests
-from mutagen.id3 import (
-    ID3,
-    APIC,
-    TALB,
-    TPE1,
-    TPE2,
-    TCON,
-    TDRC,
-    TRCK,
-    TIT2,
-    ID3NoHeaderError,
-)
+from sqlalchemy import update
 
 from app.config import settings
 from app.database import async_session_maker
 from app.models import QueueItem, Download
+from app.services.adaptive_concurrency import segment_limiter
+from app.services.bandwidth import bandwidth_scheduler
+from app.services.cancellation import DownloadCancelled, cancellation_registry
+from app.services.dedup import (
+    find_duplicate_book,
+    hash_audio,
+    hash_file,
+    link_duplicate_chapter,
+    normalize_url,
+    title_key,
+    verified_chapter_sizes,
+)
+from app.services.disk_space import (
+    InsufficientSpaceError,
+    chapter_sizes,
+    ensure_free_space,
+    estimate_total,
+    fill_estimates,
+    preallocate,
+)
+from app.services.heartbeat import TransferActivity, heartbeat
+from app.services.integrity import IntegrityError, StreamVerifier
+from app.services.library import library_scanner
+from app.services.manifest import (
+    load_manifest,
+    record_content_lengths,
+    refresh_book_data,
+    save_manifest,
+)
+from app.services.mirrors import MirrorSet
+from app.services.prefetch import metadata_prefetcher
 from app.services.progress_tracker import progress_tracker
+from app.services.progress_writer import ProgressWriter
+from app.services.queue_scheduler import claim_next_item
+from app.services.tagging import BookTag, fetch_cover, strip_leading_id3
+from app.services.throughput import ThroughputMeter
+from app.services.transcode import run_ffmpeg, schedule_assembly
 from scrapers import get_scraper, TokybookScraper
 
 # Lock to ensure only one worker runs at a time
@@ -36,70 +63,299 @@ def sanitize_title_for_fs(title: str) -> str:
     return re.sub(r'[<>:"/\\|?*]', "_", title).strip()
 
 
-def download_chapter_session(session, url, final_file_name, headers, max_attempts=5):
-    """Download a chapter using session with retry logic."""
-    for attempt in range(max_attempts):
+def download_chapter_session(
+    session,
+    url,
+    final_file_name,
+    headers,
+    max_attempts=5,
+    tag_bytes=None,
+    throttle=None,
+    cancel_event=None,
+):
+    """Download a chapter using session with retry logic.
+
+    If ``tag_bytes`` is given it is written ahead of the audio, replacing any
+    ID3v2 tag the source file carries, so the chapter is tagged in one pass.
+    ``throttle(nbytes)`` is called for every chunk and may block to enforce
+    bandwidth limits. Setting ``cancel_event`` aborts the transfer at the next
+    chunk with ``DownloadCancelled``.
+
+    The chapter is written to a ``.part`` file (preallocated when the size is
+    known) and only renamed into place once it passes verification, so a
+    crash never leaves a partial file under the final name.
+
+    Returns the chapter's integrity result (see ``StreamVerifier``), computed
+    while streaming, or None if every attempt failed.
+    """
+    temp_file_name = final_file_name + ".part"
+    try:
+        for attempt in range(max_attempts):
+            try:
+                with session.get(url, headers=headers, stream=True, timeout=(10, 180)) as r:
+                    if r.status_code == 403:
+                        raise requests.exceptions.HTTPError("403 Forbidden")
+                    r.raise_for_status()
+
+                    # Content-Length is the encoded size; only compare it when the
+                    # body isn't transparently decompressed
+                    expected = None
+                    if "Content-Length" in r.headers and not r.headers.get("Content-Encoding"):
+                        expected = int(r.headers["Content-Length"])
+                    verifier = StreamVerifier(expected)
+
+                    chunks = verifier.count_received(r.iter_content(chunk_size=8192))
+                    with open(temp_file_name, "wb") as f:
+                        if expected:
+                            preallocate(f, len(tag_bytes or b"") + expected)
+                        if tag_bytes:
+                            f.write(tag_bytes)
+                            verifier.update(tag_bytes)
+                            chunks = strip_leading_id3(chunks)
+                        for chunk in chunks:
+                            if cancel_event and cancel_event.is_set():
+                                raise DownloadCancelled()
+                            if chunk:
+                                f.write(chunk)
+                                verifier.update(chunk)
+                                if throttle:
+                                    throttle(len(chunk))
+                        # Drop any preallocated space we didn't use
+                        f.truncate()
+                    verification = verifier.verify()
+                os.replace(temp_file_name, final_file_name)
+                return verification
+            except (requests.exceptions.RequestException, IncompleteRead, IntegrityError) as e:
+                print(f"Attempt {attempt + 1} failed: {e}")
+                if attempt < max_attempts - 1:
+                    if cancel_event:
+                        if cancel_event.wait(2 ** attempt):
+                            raise DownloadCancelled()
+                    else:
+                        time.sleep(2 ** attempt)
+        return None
+    finally:
+        if os.path.exists(temp_file_name):
+            os.remove(temp_file_name)
+
+
+async def _fetch_chapter(
+    source: dict,
+    chapter: dict,
+    i: int,
+    total_chapters: int,
+    chapter_title: str,
+    final_file_name: str,
+    book_dir: str,
+    book_tag: BookTag,
+    session,
+    throttle,
+    cancel_event: threading.Event,
+    activity: TransferActivity,
+    max_attempts: int = 5,
+) -> dict:
+    """Download (and tag) one chapter from ``source``, returning its verification result.
+
+    ``source`` is the book data of the site in use, which may be a mirror;
+    file names and tags always come from the original book. The FFmpeg
+    transcode runs under ``activity.busy()`` so it doesn't count as a stall.
+    """
+    loop = asyncio.get_event_loop()
+
+    # Tokybook uses m3u8 streaming
+    if source.get("site") == "tokybook.com":
+        temp_ts_file = os.path.join(book_dir, f"{chapter_title}.ts")
+        temp_mp3_file = final_file_name + ".part"
+        ts_verifier = StreamVerifier(fmt="ts")
+
+        await loop.run_in_executor(
+            None,
+            TokybookScraper.download_chapter,
+            chapter,
+            source,
+            temp_ts_file,
+            None,
+            segment_limiter,
+            throttle,
+            ts_verifier,
+            cancel_event,
+        )
+        ts_verifier.verify()
+
+        # Convert TS to MP3 using FFmpeg, writing the tag in the same pass
+        cover_input = []
+        if book_tag.cover_data:
+            cover_input = ["-f", "image2pipe", "-i", "pipe:0"]
         try:
-            with session.get(url, headers=headers, stream=True, timeout=(10, 180)) as r:
-                if r.status_code == 403:
-                    raise requests.exceptions.HTTPError("403 Forbidden")
-                r.raise_for_status()
-                with open(final_file_name, "wb") as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-            return True
-        except (requests.exceptions.RequestException, IncompleteRead) as e:
-            print(f"Attempt {attempt + 1} failed: {e}")
-            if attempt < max_attempts - 1:
-                time.sleep(2 ** attempt)
-    return False
+            with activity.busy():
+                await run_ffmpeg(
+                    [
+                        "-i", temp_ts_file,
+                        *cover_input,
+                        *book_tag.ffmpeg_args(i, total_chapters, chapter_title),
+                        "-acodec", "libmp3lame",
+                        "-q:a", "2",
+                        "-f", "mp3",
+                        temp_mp3_file,
+                    ],
+                    input=book_tag.cover_data,
+                )
+        except subprocess.CalledProcessError:
+            if os.path.exists(temp_mp3_file):
+                os.remove(temp_mp3_file)
+            raise Exception(f"FFmpeg conversion failed for {chapter_title}")
+        finally:
+            if os.path.exists(temp_ts_file):
+                os.remove(temp_ts_file)
+
+        # The segments were verified as they were written; FFmpeg's
+        # output only needs hashing for later verification
+        sha256, size = await loop.run_in_executor(
+            None, hash_file, temp_mp3_file
+        )
+        os.replace(temp_mp3_file, final_file_name)
+        verification = {
+            "sha256": sha256,
+            "size": size,
+            "expected_size": None,
+            "format": "audio",
+            "ok": True,
+            "error": None,
+        }
+
+    # Session-based download for other sites
+    else:
+        headers = source.get("site_headers", {})
+        verification = await loop.run_in_executor(
+            None,
+            download_chapter_session,
+            session,
+            chapter["url"],
+            final_file_name,
+            headers,
+            max_attempts,
+            book_tag.render(i, total_chapters, chapter_title),
+            throttle,
+            cancel_event,
+        )
+        if not verification:
+            raise Exception(f"Failed to download {chapter_title}")
+
+    return verification
 
 
 async def process_single_download(queue_item: QueueItem) -> bool:
     """Process a single download from the queue."""
+    cancel_event = cancellation_registry.register(queue_item.id)
+    activity = TransferActivity()
+    heartbeat_task = asyncio.create_task(heartbeat(queue_item.id, activity))
+    try:
+        return await _download_book(queue_item, cancel_event, activity)
+    finally:
+        heartbeat_task.cancel()
+        progress_tracker.forget(queue_item.id)
+        cancellation_registry.unregister(queue_item.id)
+        bandwidth_scheduler.unregister(queue_item.id)
+
+
+async def _stopped(db, item: QueueItem) -> bool:
+    """Finish a download interrupted through its cancel event."""
+    reason = cancellation_registry.reason(item.id)
+    if reason == "stalled":
+        if item.attempts < settings.max_attempts:
+            # Back to the queue; verified chapters are skipped on the next run
+            item.status = "pending"
+            item.error_message = (
+                f"Stalled, retrying (attempt {item.attempts + 1} of {settings.max_attempts})"
+            )
+            item.worker_id = None
+            item.heartbeat_at = None
+            await db.commit()
+            await progress_tracker.queue_update(item.id, "pending", message=item.error_message)
+        else:
+            item.status = "failed"
+            item.error_message = (
+                f"Stalled: no data received for {int(settings.stall_timeout)}s "
+                f"({item.attempts} attempts)"
+            )
+            await db.commit()
+            await progress_tracker.download_error(item.id, item.error_message)
+    elif reason == "lease_lost":
+        # Another worker owns the item now; leave its row alone
+        pass
+    elif reason == "shutdown":
+        # Release the lease so the next start resumes it straight away
+        item.status = "pending"
+        item.worker_id = None
+        item.heartbeat_at = None
+        await db.commit()
+    else:
+        # Cancelled by the user: the API has already set the status
+        await progress_tracker.queue_update(item.id, "cancelled")
+    return False
+
+
+async def _download_book(
+    queue_item: QueueItem, cancel_event: threading.Event, activity: TransferActivity
+) -> bool:
     async with async_session_maker() as db:
-        # Update status to fetching
+        # Already claimed (status "fetching") by process_queue
         result = await db.get(QueueItem, queue_item.id)
         if not result or result.status == "cancelled":
             return False
 
-        result.status = "fetching"
-        result.started_at = datetime.utcnow()
-        await db.commit()
+        loop = asyncio.get_event_loop()
 
-        await progress_tracker.queue_update(
-            queue_item.id, "fetching", message="Fetching book metadata..."
-        )
+        # Fetched while the previous book downloaded, if the prefetcher got to it
+        prefetched = await metadata_prefetcher.take(queue_item.id)
+        book_data = prefetched.book_data if prefetched else None
+        scraped = prefetched is not None
 
-        # Get scraper and fetch book data
-        scraper = get_scraper(queue_item.url)
-        if not scraper:
-            result.status = "failed"
-            result.error_message = "Unsupported website"
-            await db.commit()
-            await progress_tracker.download_error(queue_item.id, "Unsupported website")
-            return False
+        # Retries and restarts reuse the chapter list scraped last time
+        if not book_data:
+            book_data = await load_manifest(db, queue_item.id)
+            if book_data:
+                book_data = await loop.run_in_executor(
+                    None, refresh_book_data, queue_item.url, book_data
+                )
 
-        try:
-            # Run scraper in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            book_data = await loop.run_in_executor(
-                None, scraper.fetch_book_data, queue_item.url
+        if not book_data:
+            scraped = True
+            await progress_tracker.queue_update(
+                queue_item.id, "fetching", message="Fetching book metadata..."
             )
-        except Exception as e:
-            result.status = "failed"
-            result.error_message = str(e)
-            await db.commit()
-            await progress_tracker.download_error(queue_item.id, str(e))
-            return False
 
-        if not book_data:
-            result.status = "failed"
-            result.error_message = "Could not retrieve book data"
-            await db.commit()
-            await progress_tracker.download_error(queue_item.id, "Could not retrieve book data")
-            return False
+            # Get scraper and fetch book data
+            scraper = get_scraper(queue_item.url)
+            if not scraper:
+                result.status = "failed"
+                result.error_message = "Unsupported website"
+                await db.commit()
+                await progress_tracker.download_error(queue_item.id, "Unsupported website")
+                return False
+
+            try:
+                # Run scraper in thread pool to avoid blocking
+                book_data = await loop.run_in_executor(
+                    None, scraper.fetch_book_data, queue_item.url
+                )
+            except Exception as e:
+                result.status = "failed"
+                result.error_message = str(e)
+                await db.commit()
+                await progress_tracker.download_error(queue_item.id, str(e))
+                return False
+
+            if not book_data:
+                result.status = "failed"
+                result.error_message = "Could not retrieve book data"
+                await db.commit()
+                await progress_tracker.download_error(queue_item.id, "Could not retrieve book data")
+                return False
+
+        # Cancelled (or stalled) while fetching
+        if cancel_event.is_set():
+            return await _stopped(db, result)
 
         # Update queue item with metadata
         result.title = book_data.get("title")
@@ -107,9 +363,38 @@ async def process_single_download(queue_item: QueueItem) -> bool:
         result.narrator = book_data.get("narrator")
         result.site = book_data.get("site")
         result.cover_url = book_data.get("cover_url")
+        result.title_key = title_key(result.title)
         result.total_chapters = len(book_data.get("chapters", []))
-        result.status = "downloading"
+        if scraped:
+            await save_manifest(db, queue_item.id, book_data)
+
+        # Same book already downloaded (or downloading) from another URL/site
+        if not result.allow_duplicate:
+            duplicate = await find_duplicate_book(
+                db, result.id, result.title, result.author, result.total_chapters
+            )
+            if duplicate:
+                result.status = "cancelled"
+                result.error_message = f"Skipped: {duplicate}"
+                await db.commit()
+                await progress_tracker.queue_update(
+                    queue_item.id, "cancelled", message=result.error_message
+                )
+                return False
+
+        # Only from "fetching": a cancel (or delete) since the check above must stick
+        claimed = await db.execute(
+            update(QueueItem)
+            .where(QueueItem.id == result.id, QueueItem.status == "fetching")
+            .values(status="downloading")
+        )
         await db.commit()
+        if claimed.rowcount == 0:
+            # Cancelled or deleted through the API in the meantime; its status stands
+            await progress_tracker.queue_update(queue_item.id, "cancelled")
+            return False
+        if cancel_event.is_set():
+            return await _stopped(db, result)
 
         await progress_tracker.queue_update(
             queue_item.id,
@@ -119,146 +404,197 @@ async def process_single_download(queue_item: QueueItem) -> bool:
         )
 
         # Download cover art
-        artwork_data = None
-        mime_type = None
-        if book_data.get("cover_url"):
-            try:
-                artwork_response = requests.get(book_data["cover_url"], timeout=10)
-                artwork_response.raise_for_status()
-                content_type = artwork_response.headers.get("Content-Type", "")
-                if content_type.startswith("image/"):
-                    artwork_data = artwork_response.content
-                    mime_type = "image/jpeg" if "jpeg" in content_type else "image/png"
-            except Exception:
-                pass
+        if prefetched:
+            artwork_data, mime_type = prefetched.artwork_data, prefetched.mime_type
+        else:
+            artwork_data, mime_type = await loop.run_in_executor(
+                None, fetch_cover, book_data.get("cover_url")
+            )
 
         # Create output directory
         sanitized_title = sanitize_title_for_fs(book_data["title"])
-        book_dir = os.path.join(settings.books_output_dir, sanitized_title)
+        # Normalized like the library scanner's paths, which it's matched against
+        book_dir = os.path.normpath(os.path.join(settings.books_output_dir, sanitized_title))
         os.makedirs(book_dir, exist_ok=True)
 
+        # Build the tag (and process the cover) once for the whole book
+        book_tag = await loop.run_in_executor(
+            None, BookTag.from_book, book_data, sanitized_title, artwork_data, mime_type
+        )
+
         # Download chapters
         total_chapters = len(book_data["chapters"])
         session = requests.Session()
+        progress = ProgressWriter(db, result)
+        verified = await verified_chapter_sizes(db, [
+            os.path.join(book_dir, f"{c['title']}.mp3") for c in book_data["chapters"]
+        ])
+        # Only chapters still on disk unchanged can be skipped (resume logic)
+        verified = {
+            path: size for path, size in verified.items()
+            if os.path.exists(path) and os.path.getsize(path) == size
+        }
+
+        # Chapter sizes drive byte-level progress and the disk-space preflight
+        remaining = [
+            c for c in book_data["chapters"]
+            if os.path.join(book_dir, f"{c['title']}.mp3") not in verified
+        ]
+        # One HEAD request per chapter: slow on long books, but not a stall
+        with activity.busy():
+            sizes = await loop.run_in_executor(
+                None,
+                chapter_sizes,
+                remaining,
+                book_data.get("site_headers", {}),
+                book_data.get("site"),
+            )
+        await record_content_lengths(db, queue_item.id, book_data["chapters"])
+        estimates = dict(zip(
+            (os.path.join(book_dir, f"{c['title']}.mp3") for c in remaining),
+            fill_estimates(sizes),
+        ))
+        completed_bytes = sum(verified.values())
+        meter = ThroughputMeter(completed_bytes + sum(estimates.values()), completed_bytes)
+        progress_state = {"current_chapter": 0, "message": None}
+
+        def progress_snapshot() -> dict:
+            return {**progress_state, "total_chapters": total_chapters, **meter.snapshot()}
+
+        # Per-chunk progress, coalesced to a few events per second
+        report_progress = progress_tracker.progress_reporter(queue_item.id, progress_snapshot)
+
+        bandwidth_scheduler.register(queue_item.id, book_data.get("site"))
+        consume = functools.partial(
+            bandwidth_scheduler.consume, queue_item.id, cancel_event=cancel_event
+        )
 
-        for i, chapter in enumerate(book_data["chapters"], start=1):
-            # Check if cancelled
-            await db.refresh(result)
-            if result.status == "cancelled":
-                await progress_tracker.queue_update(queue_item.id, "cancelled")
+        def throttle(nbytes: int):
+            activity.add(nbytes)
+            meter.add(nbytes)
+            report_progress()
+            consume(nbytes)
+
+        # Refuse books that would fill the volume before writing anything
+        if settings.disk_preflight:
+            try:
+                ensure_free_space(book_dir, estimate_total(sizes))
+            except InsufficientSpaceError as e:
+                result.status = "failed"
+                result.error_message = str(e)
+                await db.commit()
+                await progress_tracker.download_error(queue_item.id, str(e))
                 return False
 
+        mirrors = MirrorSet(book_data, queue_item.url)
+        slow_chapters = 0
+
+        async def use_mirror(mirror: dict, reason: str):
+            print(f"Queue item {queue_item.id}: switching to mirror {mirror['url']} ({reason})")
+            bandwidth_scheduler.register(queue_item.id, mirror.get("site"))
+            await progress_tracker.queue_update(
+                queue_item.id, "downloading", message=f"Switched to {mirror.get('site')}"
+            )
+
+        for i, chapter in enumerate(book_data["chapters"], start=1):
+            if cancel_event.is_set():
+                await progress.flush()
+                return await _stopped(db, result)
+            # Conversion and bookkeeping between chapters don't count as a stall
+            activity.touch()
+
             chapter_title = chapter["title"]
             final_file_name = os.path.join(book_dir, f"{chapter_title}.mp3")
 
-            # Skip if already exists (resume logic)
-            if os.path.exists(final_file_name):
-                # Check if next chapter exists
-                if i < total_chapters:
-                    next_title = book_data["chapters"][i]["title"]
-                    next_path = os.path.join(book_dir, f"{next_title}.mp3")
-                    if os.path.exists(next_path):
-                        result.current_chapter = i
-                        await db.commit()
-                        await progress_tracker.download_progress(
-                            queue_item.id, i, total_chapters, f"Skipping {chapter_title}"
-                        )
-                        continue
-
-            # Calculate ETA if we have progress data
-            eta_seconds = None
-            if result.current_chapter > 0 and result.started_at:
-                elapsed = (datetime.utcnow() - result.started_at).total_seconds()
-                time_per_chapter = elapsed / result.current_chapter
-                chapters_remaining = result.total_chapters - result.current_chapter
-                eta_seconds = int(time_per_chapter * chapters_remaining)
-
-            await progress_tracker.download_progress(
-                queue_item.id, i, total_chapters, f"Downloading {chapter_title}...", eta_seconds
-            )
+            # Skip chapters already downloaded and verified (resume logic)
+            if final_file_name in verified:
+                await progress.chapter_done(i)
+                progress_state.update(current_chapter=i, message=f"Skipping {chapter_title}")
+                report_progress()
+                continue
 
-            try:
-                # Tokybook uses m3u8 streaming
-                if book_data.get("site") == "tokybook.com":
-                    temp_ts_file = os.path.join(book_dir, f"{chapter_title}.ts")
-
-                    loop = asyncio.get_event_loop()
-                    await loop.run_in_executor(
-                        None,
-                        TokybookScraper.download_chapter,
-                        chapter,
-                        book_data,
-                        temp_ts_file,
-                        None,
-                    )
+            # ETA comes from smoothed byte throughput (see ThroughputMeter)
+            progress_state.update(current_chapter=i, message=f"Downloading {chapter_title}...")
+            await progress_tracker.download_progress(queue_item.id, **progress_snapshot())
 
-                    # Convert TS to MP3 using FFmpeg
+            try:
+                chapter_started = time.monotonic()
+                bytes_before = activity.bytes
+                busy_before = activity.busy_seconds
+                # Give up on a failing source sooner when a mirror may take over
+                max_attempts = 2 if settings.mirror_failover else 5
+                while True:
                     try:
-                        subprocess.run(
-                            [
-                                "ffmpeg",
-                                "-i", temp_ts_file,
-                                "-y",
-                                "-vn",
-                                "-acodec", "libmp3lame",
-                                "-q:a", "2",
-                                "-loglevel", "error",
-                                final_file_name,
-                            ],
-                            check=True,
+                        verification = await _fetch_chapter(
+                            mirrors.current,
+                            mirrors.current["chapters"][i - 1],
+                            i,
+                            total_chapters,
+                            chapter_title,
+                            final_file_name,
+                            book_dir,
+                            book_tag,
+                            session,
+                            throttle,
+                            cancel_event,
+                            activity,
+                            max_attempts,
                         )
-                        if os.path.exists(temp_ts_file):
-                            os.remove(temp_ts_file)
-                    except subprocess.CalledProcessError:
-                        raise Exception(f"FFmpeg conversion failed for {chapter_title}")
-
-                # Session-based download for other sites
+                        break
+                    except Exception as e:
+                        if cancel_event.is_set() or not settings.mirror_failover:
+                            raise
+                        # Completed chapters stay; carry on from this one elsewhere
+                        with activity.busy():
+                            mirror = await mirrors.failover()
+                        if mirror:
+                            await use_mirror(mirror, str(e))
+                        elif max_attempts < 5:
+                            # No mirror: fall back to patient retries on this source
+                            max_attempts = 5
+                        else:
+                            raise
+
+                # A source that works but stays slow is swapped for a faster mirror.
+                # Only transfer time counts: transcoding and mirror searches
+                # run under activity.busy()
+                transfer_seconds = (
+                    time.monotonic() - chapter_started - (activity.busy_seconds - busy_before)
+                )
+                rate = (activity.bytes - bytes_before) / max(transfer_seconds, 1e-3)
+                if (
+                    settings.mirror_failover
+                    and not bandwidth_scheduler.is_limited(mirrors.current.get("site"))
+                    and rate < settings.mirror_min_throughput_kib * 1024
+                ):
+                    slow_chapters += 1
+                    if slow_chapters >= settings.mirror_slow_chapters:
+                        slow_chapters = 0
+                        with activity.busy():
+                            mirror = await mirrors.failover(min_rate=rate)
+                        if mirror:
+                            await use_mirror(mirror, f"slow source ({int(rate / 1024)} KiB/s)")
                 else:
-                    headers = book_data.get("site_headers", {})
-                    loop = asyncio.get_event_loop()
-                    success = await loop.run_in_executor(
-                        None,
-                        download_chapter_session,
-                        session,
-                        chapter["url"],
-                        final_file_name,
-                        headers,
+                    slow_chapters = 0
+
+                verification["audio_sha256"] = await loop.run_in_executor(
+                    None, hash_audio, final_file_name
+                )
+                # An identical file stored elsewhere becomes a hard link
+                if settings.dedup_hardlink_chapters:
+                    await link_duplicate_chapter(
+                        db, final_file_name, verification["sha256"], verification["audio_sha256"]
                     )
-                    if not success:
-                        raise Exception(f"Failed to download {chapter_title}")
-
-                # Add ID3 tags
-                try:
-                    audio = ID3(final_file_name)
-                except ID3NoHeaderError:
-                    audio = ID3()
-
-                audio.add(TALB(encoding=3, text=sanitized_title))
-                audio.add(TCON(encoding=3, text="Audiobook"))
-                audio.add(TRCK(encoding=3, text=f"{i}/{total_chapters}"))
-                audio.add(TIT2(encoding=3, text=chapter_title))
-
-                if book_data.get("author"):
-                    audio.add(TPE1(encoding=3, text=book_data["author"]))
-                if book_data.get("narrator"):
-                    audio.add(TPE2(encoding=3, text=book_data["narrator"]))
-                if book_data.get("year"):
-                    audio.add(TDRC(encoding=3, text=book_data["year"]))
-                if artwork_data and mime_type:
-                    audio.add(APIC(
-                        encoding=3,
-                        mime=mime_type,
-                        type=3,
-                        desc="Cover",
-                        data=artwork_data,
-                    ))
-
-                audio.save(final_file_name, v2_version=3)
-
-                result.current_chapter = i
-                await db.commit()
+
+                # Persisted with the next coalesced progress write
+                await progress.chapter_done(i, final_file_name, verification)
+                # Counted in bytes transferred, like the progress within a chapter
+                meter.finish_part(estimates.get(final_file_name, 0), activity.bytes - bytes_before)
 
             except Exception as e:
+                await progress.flush()
+                if cancel_event.is_set():
+                    return await _stopped(db, result)
                 result.status = "failed"
                 result.error_message = str(e)
                 await db.commit()
@@ -266,6 +602,7 @@ async def process_single_download(queue_item: QueueItem) -> bool:
                 return False
 
         # Mark as completed
+        await progress.flush()
         result.status = "completed"
         result.completed_at = datetime.utcnow()
         await db.commit()
@@ -274,7 +611,9 @@ async def process_single_download(queue_item: QueueItem) -> bool:
         download = Download(
             queue_id=queue_item.id,
             url=queue_item.url,
+            normalized_url=normalize_url(queue_item.url),
             title=book_data["title"],
+            title_key=title_key(book_data["title"]),
             author=book_data.get("author"),
             narrator=book_data.get("narrator"),
             year=book_data.get("year"),
@@ -287,11 +626,15 @@ async def process_single_download(queue_item: QueueItem) -> bool:
         await db.commit()
 
         await progress_tracker.download_complete(queue_item.id, book_data["title"])
+        library_scanner.schedule(book_dir)
+
+        # Optional single-file (m4b/mka) output, built off the download path
+        schedule_assembly(queue_item.id, book_dir, book_data["chapters"], book_tag)
         return True
 
 
-async def process_queue():
-    """Process pending items in the queue."""
+async def process_queue(stop: asyncio.Event | None = None):
+    """Process pending items in the queue until it is empty or ``stop`` is set."""
     global _is_processing
 
     async with _worker_lock:
@@ -300,23 +643,17 @@ async def process_queue():
         _is_processing = True
 
     try:
-        while True:
+        while not (stop and stop.is_set()):
             async with async_session_maker() as db:
-                from sqlalchemy import select
-
-                # Get next pending item
-                result = await db.execute(
-                    select(QueueItem)
-                    .where(QueueItem.status == "pending")
-                    .order_by(QueueItem.created_at)
-                    .limit(1)
-                )
-                queue_item = result.scalar_one_or_none()
+                # Highest priority first, sites interleaved (atomic claim)
+                queue_item = await claim_next_item(db)
 
-                if not queue_item:
-                    break
+            if not queue_item:
+                break
 
-                await process_single_download(queue_item)
+            # Resolve the next items while this one downloads
+            metadata_prefetcher.schedule()
+            await process_single_download(queue_item)
 
     finally:
         _is_processing = False
@@ -0,0 +1,108 @@
+import asyncio
+import json
+from typing import Any, Callable
+
+from sqlalchemy import delete, func, select
+
+from app.config import settings
+from app.database import async_session_maker
+from app.models import Event
+
+# Called with (seq, event_type, data) for every event, in sequence order
+Deliver = Callable[[int, str, dict[str, Any]], None]
+
+
+class InMemoryEventBackend:
+    """Delivers events to subscribers of this process only."""
+
+    def __init__(self, deliver: Deliver | None = None):
+        self._deliver = deliver
+        self._seq = 0
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+
+    async def stop(self):
+        pass
+
+    async def publish(self, event_type: str, data: dict[str, Any]):
+        self._seq += 1
+        self._deliver(self._seq, event_type, data)
+
+
+class SQLiteEventBackend:
+    """Shares events between processes through the ``events`` table.
+
+    Publishing inserts a row; every process (API workers, a separate
+    download worker) polls for new rows and delivers them in id order, so
+    the row id is a sequence number shared by all of them and
+    ``Last-Event-ID`` works whichever process a client reconnects to.
+    """
+
+    def __init__(self, poll_interval: float | None = None):
+        self.poll_interval = poll_interval or settings.event_poll_interval
+        self._deliver: Deliver | None = None
+        self._last_id = 0
+        self._task: asyncio.Task | None = None
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+        # Replay recent history so reconnecting clients can still resume
+        async with async_session_maker() as db:
+            last_id = await db.scalar(select(func.max(Event.id))) or 0
+            self._last_id = max(last_id - settings.event_history_size, 0)
+        await self._poll_once()
+        self._task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def publish(self, event_type: str, data: dict[str, Any]):
+        try:
+            async with async_session_maker() as db:
+                db.add(Event(type=event_type, data=json.dumps(data)))
+                await db.commit()
+        except Exception as e:
+            # Progress events are best effort; never fail a download over them
+            print(f"Could not publish {event_type} event: {e}")
+
+    async def _poll_once(self):
+        async with async_session_maker() as db:
+            result = await db.execute(
+                select(Event.id, Event.type, Event.data)
+                .where(Event.id > self._last_id)
+                .order_by(Event.id)
+            )
+            for event_id, event_type, data in result.all():
+                self._last_id = event_id
+                self._deliver(event_id, event_type, json.loads(data))
+
+    async def _poll(self):
+        polls = 0
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self._poll_once()
+                polls += 1
+                if polls % 100 == 0:
+                    await self._prune()
+            except Exception as e:
+                print(f"Event poll failed: {e}")
+
+    async def _prune(self):
+        """Keep the table around twice the replay history."""
+        async with async_session_maker() as db:
+            await db.execute(
+                delete(Event).where(
+                    Event.id <= self._last_id - 2 * settings.event_history_size
+                )
+            )
+            await db.commit()
+
+
+def create_event_backend():
+    if settings.event_backend == "sqlite":
+        return SQLiteEventBackend()
+    return InMemoryEventBackend()
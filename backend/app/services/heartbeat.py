@@ -0,0 +1,92 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import update
+
+from app.config import settings
+from app.database import async_session_maker
+from app.models import QueueItem
+from app.services.cancellation import cancellation_registry
+
+# Identifies this process in queue leases
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class TransferActivity:
+    """Byte counter for one download, fed from the transfer threads."""
+
+    def __init__(self):
+        self.bytes = 0
+        self.last_progress = time.monotonic()
+        # Total time spent in busy() phases, so rates can leave it out
+        self.busy_seconds = 0.0
+        self._busy = 0
+
+    def add(self, nbytes: int):
+        self.bytes += nbytes
+        self.last_progress = time.monotonic()
+
+    def touch(self):
+        """Restart the stall clock (e.g. between phases that transfer nothing)."""
+        self.last_progress = time.monotonic()
+
+    @contextmanager
+    def busy(self):
+        """Pause stall detection for work that moves no bytes (transcoding, probing, mirror search)."""
+        self._busy += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._busy -= 1
+            if not self._busy:
+                self.busy_seconds += time.monotonic() - started
+            self.touch()
+
+    def idle_for(self) -> float:
+        if self._busy:
+            return 0.0
+        return time.monotonic() - self.last_progress
+
+
+async def heartbeat(queue_id: int, activity: TransferActivity):
+    """Renew the item's lease periodically and watch for reasons to stop.
+
+    This is also how a worker in another process than the API learns about
+    cancellation: the API only sets the status. A stalled download is
+    cancelled with reason ``"stalled"`` so the worker can requeue it, and
+    one whose lease was taken over with ``"lease_lost"``.
+    """
+    while True:
+        await asyncio.sleep(settings.heartbeat_interval)
+        try:
+            async with async_session_maker() as db:
+                result = await db.execute(
+                    update(QueueItem)
+                    .where(QueueItem.id == queue_id, QueueItem.worker_id == WORKER_ID)
+                    # A lease renewal isn't a change clients need to see
+                    .values(heartbeat_at=datetime.utcnow(), updated_at=QueueItem.updated_at)
+                    .returning(QueueItem.status)
+                )
+                item_status = result.scalar_one_or_none()
+                await db.commit()
+        except Exception as e:
+            print(f"Heartbeat failed for queue item {queue_id}: {e}")
+        else:
+            if item_status is None:
+                print(f"Lost the lease on queue item {queue_id}, aborting")
+                cancellation_registry.cancel(queue_id, reason="lease_lost")
+                return
+            if item_status == "cancelled":
+                cancellation_registry.cancel(queue_id)
+                return
+
+        if settings.stall_timeout and activity.idle_for() > settings.stall_timeout:
+            print(f"Queue item {queue_id} stalled for {int(activity.idle_for())}s, aborting")
+            cancellation_registry.cancel(queue_id, reason="stalled")
+            return
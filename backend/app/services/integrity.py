@@ -0,0 +1,153 @@
+import hashlib
+
+# How much audio (after any ID3 tag) is kept for the frame-header scan
+SCAN_BYTES = 64 * 1024
+
+_BITRATES = {
+    # (version is MPEG-1, layer) -> kbps by index
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],  # MPEG-2.5
+}
+
+
+class IntegrityError(Exception):
+    pass
+
+
+def _mpeg_frame_length(h: bytes) -> int | None:
+    """Length of the MPEG audio frame whose 4-byte header starts ``h``, if valid."""
+    if len(h) < 4 or h[0] != 0xFF or (h[1] & 0xE0) != 0xE0:
+        return None
+    version = (h[1] >> 3) & 3
+    layer = 4 - ((h[1] >> 1) & 3)
+    bitrate_index = h[2] >> 4
+    rate_index = (h[2] >> 2) & 3
+    padding = (h[2] >> 1) & 1
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = _BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4
+    if layer == 3 and not mpeg1:
+        return 72 * bitrate // sample_rate + padding
+    return 144 * bitrate // sample_rate + padding
+
+
+def _adts_frame_length(h: bytes) -> int | None:
+    """Length of the AAC ADTS frame whose header starts ``h``, if valid."""
+    if len(h) < 7 or h[0] != 0xFF or (h[1] & 0xF6) != 0xF0:
+        return None
+    length = ((h[3] & 0x03) << 11) | (h[4] << 3) | (h[5] >> 5)
+    return length if length >= 7 else None
+
+
+def _id3_size(head: bytes) -> int:
+    if len(head) < 10 or not head.startswith(b"ID3"):
+        return 0
+    size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+    return size + (20 if head[5] & 0x10 else 10)
+
+
+def scan_audio(head: bytes, fmt: str = "audio") -> str | None:
+    """Check the start of a file looks like real audio; return a problem description or None.
+
+    ``fmt`` is ``"audio"`` for MP3/ADTS files or ``"ts"`` for HLS segments,
+    which may be MPEG transport streams or raw ADTS.
+    """
+    if not head:
+        return "Empty file"
+    if head.lstrip()[:1] == b"<":
+        return "Received an HTML/text page instead of audio"
+
+    if fmt == "ts" and head[0] == 0x47:
+        if len(head) > 188 and head[188] != 0x47:
+            return "Corrupt MPEG-TS stream"
+        return None
+
+    audio = head[_id3_size(head):]
+    if not audio:
+        return "No audio after ID3 tag"
+
+    # Find two consecutive valid frame headers, allowing for a little junk
+    # before the first one.
+    for pos in range(min(len(audio) - 4, 4096) + 1):
+        for frame_length in (_mpeg_frame_length, _adts_frame_length):
+            length = frame_length(audio[pos:pos + 7])
+            if not length:
+                continue
+            following = pos + length
+            if following + 4 > len(audio):
+                # Buffer ends mid-stream (short file): one good frame is enough
+                return None
+            second = frame_length(audio[following:following + 7])
+            if second:
+                return None
+    return "No MPEG/ADTS audio frames found"
+
+
+class StreamVerifier:
+    """Integrity check computed while a file is written.
+
+    Tracks a running SHA-256 and size of the written bytes, the raw bytes
+    received against ``Content-Length``, and keeps just enough of the start
+    of the file for a frame-header scan.
+    """
+
+    def __init__(self, expected_length: int | None = None, fmt: str = "audio"):
+        self.expected_length = expected_length
+        self.fmt = fmt
+        self.received = 0
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._head = b""
+        self._head_limit: int | None = None
+
+    def count_received(self, chunks):
+        """Wrap the raw response chunks to count them against ``Content-Length``."""
+        for chunk in chunks:
+            self.received += len(chunk)
+            yield chunk
+
+    def update(self, chunk: bytes):
+        self._hash.update(chunk)
+        self.size += len(chunk)
+        if self._head_limit is None or len(self._head) < self._head_limit:
+            self._head += chunk
+            if self._head_limit is None and len(self._head) >= 10:
+                self._head_limit = _id3_size(self._head) + SCAN_BYTES
+
+    def result(self) -> dict:
+        if self.expected_length is not None and self.received != self.expected_length:
+            error = (
+                f"Truncated download: received {self.received} of "
+                f"{self.expected_length} bytes"
+            )
+        else:
+            error = scan_audio(self._head, self.fmt)
+        return {
+            "sha256": self._hash.hexdigest(),
+            "size": self.size,
+            "expected_size": self.expected_length,
+            "format": self.fmt,
+            "ok": error is None,
+            "error": error,
+        }
+
+    def verify(self) -> dict:
+        """Return the result, raising ``IntegrityError`` if the file is bad."""
+        result = self.result()
+        if not result["ok"]:
+            raise IntegrityError(result["error"])
+        return result
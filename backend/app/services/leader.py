@@ -0,0 +1,65 @@
+import asyncio
+import fcntl
+import os
+from collections.abc import Awaitable, Callable
+
+from app.config import settings
+from app.database import engine
+
+
+class LeaderElection:
+    """Picks the one API process per deployment that does background work.
+
+    ``uvicorn --workers N`` runs the app in N processes; only the one holding
+    an exclusive lock on a file next to the database runs the embedded
+    worker, the retention job and library scans. The others keep trying
+    every ``leader_poll_interval`` seconds, and the OS drops the lock when
+    its holder exits, so another process takes over.
+    """
+
+    def __init__(self):
+        self._fd: int | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._fd is not None
+
+    def _try_acquire(self) -> bool:
+        path = f"{engine.url.database}.leader"
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def start(self, on_elected: Callable[[], Awaitable[None]]):
+        self._task = asyncio.create_task(self._run(on_elected))
+
+    async def _run(self, on_elected: Callable[[], Awaitable[None]]):
+        while not self._try_acquire():
+            await asyncio.sleep(settings.leader_poll_interval)
+        print(f"Process {os.getpid()} runs the background jobs")
+        await on_elected()
+
+    async def stop(self):
+        """Stop waiting for the lock; the caller stops the jobs before releasing it."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+# Global singleton
+leader_election = LeaderElection()
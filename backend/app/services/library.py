@@ -0,0 +1,194 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import mutagen
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+
+from app.config import settings
+from app.database import async_session_maker
+from app.models import LibraryFile
+
+AUDIO_EXTENSIONS = {".mp3", ".m4a", ".m4b", ".mka", ".aac", ".ogg", ".opus", ".flac"}
+
+# Files probed and written per transaction
+BATCH_SIZE = 500
+
+
+def _walk(root: str) -> dict[str, tuple[int, int]]:
+    """``{path: (size, mtime_ns)}`` of every audio file under ``root``."""
+    found = {}
+    pending = [root]
+    while pending:
+        try:
+            entries = os.scandir(pending.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in AUDIO_EXTENSIONS:
+                        st = entry.stat()
+                        found[entry.path] = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    # Removed while we were looking
+                    continue
+    return found
+
+
+def _probe(path: str) -> dict:
+    """Duration and bitrate of an audio file, read from its headers by mutagen."""
+    try:
+        audio = mutagen.File(path)
+    except Exception as e:
+        return {"duration": None, "bitrate": None, "error": str(e) or type(e).__name__}
+    if audio is None or audio.info is None:
+        return {"duration": None, "bitrate": None, "error": "Unrecognized audio format"}
+    return {
+        "duration": audio.info.length or None,
+        "bitrate": getattr(audio.info, "bitrate", None) or None,
+        "error": None,
+    }
+
+
+def _subtree(root: str):
+    """Condition for paths under ``root``, as a range so it can use the path index."""
+    prefix = os.path.join(root, "")
+    # "0" sorts right after "/", so this covers exactly the paths starting with prefix
+    return LibraryFile.path >= prefix, LibraryFile.path < prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+class LibraryScanner:
+    """Keeps ``library_files`` in step with the audio files on disk.
+
+    Only files whose size or mtime changed since the last scan are opened;
+    mutagen probes run on a small thread pool. A rescan of an unchanged
+    library is a directory walk plus one indexed query.
+    """
+
+    def __init__(self):
+        self.last_scan: dict | None = None
+        self._lock = asyncio.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._task: asyncio.Task | None = None
+        self._book_scans: set[asyncio.Task] = set()
+
+    def start(self):
+        if settings.library_scan_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        tasks = [t for t in (self._task, *self._book_scans) if t]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.scan()
+            except Exception as e:
+                print(f"Library scan failed: {e}")
+            await asyncio.sleep(settings.library_scan_interval)
+
+    def schedule(self, book_dir: str):
+        """Rescan one book's directory in the background (e.g. after it finished downloading)."""
+        task = asyncio.create_task(self.scan(book_dir))
+        self._book_scans.add(task)
+        task.add_done_callback(self._book_scans.discard)
+
+    async def scan(self, book_dir: str | None = None) -> dict:
+        """Sync the index with the whole library, or just the files under ``book_dir``."""
+        root = os.path.normpath(book_dir or settings.books_output_dir)
+        async with self._lock:
+            started = time.monotonic()
+            loop = asyncio.get_running_loop()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.library_scan_workers,
+                    thread_name_prefix="library-scan",
+                )
+
+            found = await loop.run_in_executor(self._executor, _walk, root)
+            async with async_session_maker() as db:
+                query = select(LibraryFile.path, LibraryFile.size, LibraryFile.mtime_ns)
+                if book_dir:
+                    query = query.where(*_subtree(root))
+                known = {path: (size, mtime) for path, size, mtime in (await db.execute(query)).all()}
+
+            changed = [path for path, stat in found.items() if known.get(path) != stat]
+            removed = [path for path in known if path not in found]
+            report = {
+                "root": root,
+                "files": len(found),
+                "added": sum(1 for path in changed if path not in known),
+                "updated": sum(1 for path in changed if path in known),
+                "removed": len(removed),
+                "unreadable": 0,
+            }
+
+            for start in range(0, len(changed), BATCH_SIZE):
+                batch = changed[start:start + BATCH_SIZE]
+                probes = await asyncio.gather(
+                    *(loop.run_in_executor(self._executor, _probe, path) for path in batch)
+                )
+                now = datetime.utcnow()
+                rows = []
+                for path, probe in zip(batch, probes):
+                    size, mtime_ns = found[path]
+                    report["unreadable"] += probe["error"] is not None
+                    rows.append({
+                        "path": path,
+                        "book_dir": os.path.dirname(path),
+                        "size": size,
+                        "mtime_ns": mtime_ns,
+                        "format": os.path.splitext(path)[1].lower().lstrip("."),
+                        "scanned_at": now,
+                        **probe,
+                    })
+                stmt = insert(LibraryFile)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[LibraryFile.path],
+                    set_={
+                        column: stmt.excluded[column]
+                        for column in ("book_dir", "size", "mtime_ns", "format",
+                                       "duration", "bitrate", "error", "scanned_at")
+                    },
+                )
+                async with async_session_maker() as db:
+                    await db.execute(stmt, rows)
+                    await db.commit()
+
+            async with async_session_maker() as db:
+                for start in range(0, len(removed), BATCH_SIZE):
+                    await db.execute(
+                        delete(LibraryFile).where(
+                            LibraryFile.path.in_(removed[start:start + BATCH_SIZE])
+                        )
+                    )
+                await db.commit()
+
+            report["seconds"] = round(time.monotonic() - started, 3)
+            report["finished_at"] = datetime.utcnow().isoformat()
+            if not book_dir:
+                self.last_scan = report
+            if changed or removed:
+                print(
+                    f"Library scan of {root}: {report['files']} files, {report['added']} added, "
+                    f"{report['updated']} updated, {report['removed']} removed "
+                    f"in {report['seconds']}s"
+                )
+            return report
+
+
+# Global singleton
+library_scanner = LibraryScanner()
@@ -0,0 +1,101 @@
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import BookManifest
+from scrapers import get_scraper
+
+# Bump when the stored layout changes; older manifests are rescraped
+MANIFEST_VERSION = 1
+
+# Per-chapter download state stored alongside the scraped chapter fields
+_CHAPTER_STATE = ("status", "size", "sha256")
+
+
+def _dumps(data: dict) -> str:
+    return json.dumps(data, separators=(",", ":"))
+
+
+async def save_manifest(db: AsyncSession, queue_id: int, book_data: dict):
+    """Store freshly scraped book data, replacing any older manifest. Leaves committing to the caller."""
+    await db.execute(delete(BookManifest).where(BookManifest.queue_id == queue_id))
+    data = {
+        **book_data,
+        "chapters": [{**c, "status": "pending"} for c in book_data.get("chapters", [])],
+    }
+    db.add(BookManifest(
+        queue_id=queue_id,
+        version=MANIFEST_VERSION,
+        fetched_at=datetime.utcnow(),
+        data=_dumps(data),
+    ))
+
+
+async def load_manifest(db: AsyncSession, queue_id: int) -> dict | None:
+    """Book data from a current, not too old manifest, or None."""
+    manifest = await db.scalar(
+        select(BookManifest).where(BookManifest.queue_id == queue_id)
+    )
+    if (
+        not manifest
+        or manifest.version != MANIFEST_VERSION
+        or datetime.utcnow() - manifest.fetched_at > timedelta(seconds=settings.manifest_max_age)
+    ):
+        return None
+    book_data = json.loads(manifest.data)
+    book_data["chapters"] = [
+        {k: v for k, v in c.items() if k not in _CHAPTER_STATE}
+        for c in book_data.get("chapters", [])
+    ]
+    return book_data
+
+
+def refresh_book_data(url: str, book_data: dict) -> dict | None:
+    """Renew the short-lived parts of stored book data (e.g. tokybook's stream token).
+
+    Scrapers opt in with a ``refresh_book_data(url, book_data)`` method;
+    returns None if the data can't be refreshed and must be scraped again.
+    """
+    scraper = get_scraper(url)
+    refresh = getattr(scraper, "refresh_book_data", None)
+    return refresh(url, book_data) if refresh else book_data
+
+
+async def mark_chapters(db: AsyncSession, queue_id: int, records: list[dict]):
+    """Record finished chapters (1-based ``chapter``, ``size``, ``sha256``) in the manifest."""
+    manifest = await db.scalar(
+        select(BookManifest).where(BookManifest.queue_id == queue_id)
+    )
+    if not manifest or not records:
+        return
+    data = json.loads(manifest.data)
+    chapters = data.get("chapters", [])
+    for r in records:
+        if 0 < r["chapter"] <= len(chapters):
+            chapters[r["chapter"] - 1].update(
+                status="done" if r["ok"] else "failed", size=r["size"], sha256=r["sha256"]
+            )
+    manifest.data = _dumps(data)
+
+
+async def record_content_lengths(db: AsyncSession, queue_id: int, chapters: list[dict]):
+    """Store the ``content_length`` found for each chapter, so retries needn't ask again.
+
+    Leaves committing to the caller.
+    """
+    manifest = await db.scalar(
+        select(BookManifest).where(BookManifest.queue_id == queue_id)
+    )
+    if not manifest:
+        return
+    data = json.loads(manifest.data)
+    stored = data.get("chapters", [])
+    if len(stored) != len(chapters):
+        return
+    for stored_chapter, chapter in zip(stored, chapters):
+        if chapter.get("content_length"):
+            stored_chapter["content_length"] = chapter["content_length"]
+    manifest.data = _dumps(data)
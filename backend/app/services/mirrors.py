@@ -0,0 +1,136 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from app.services.dedup import authors_conflict, title_key
+from scrapers import SEARCHERS, get_scraper
+
+# How much of a mirror's first chapter is read to measure its speed
+PROBE_BYTES = 256 * 1024
+
+
+def _search_site(searcher, title: str) -> list:
+    try:
+        return searcher(title, 5)
+    except Exception as e:
+        print(f"Mirror search failed: {e}")
+        return []
+
+
+def _resolve(url: str, chapter_count: int) -> dict | None:
+    """Scrape a candidate and keep it only if its chapters line up with ours."""
+    scraper = get_scraper(url)
+    if not scraper:
+        return None
+    try:
+        book_data = scraper.fetch_book_data(url)
+    except Exception as e:
+        print(f"Could not fetch mirror {url}: {e}")
+        return None
+    if not book_data or len(book_data.get("chapters", [])) != chapter_count:
+        return None
+    return {**book_data, "url": url}
+
+
+def probe_rate(book_data: dict) -> float | None:
+    """Bytes/second reading the start of the first chapter; None if it can't be measured."""
+    # Tokybook chapters are HLS playlists; there is no single file to sample
+    if book_data.get("site") == "tokybook.com":
+        return None
+    chapter = book_data["chapters"][0]
+    start = time.monotonic()
+    received = 0
+    try:
+        with requests.get(
+            chapter["url"],
+            headers={**book_data.get("site_headers", {}), "Range": f"bytes=0-{PROBE_BYTES - 1}"},
+            stream=True,
+            timeout=(10, 30),
+        ) as r:
+            r.raise_for_status()
+            for chunk in r.iter_content(chunk_size=8192):
+                received += len(chunk)
+                if received >= PROBE_BYTES:
+                    break
+    except requests.exceptions.RequestException:
+        return 0.0
+    return received / max(time.monotonic() - start, 1e-3)
+
+
+def find_mirrors(book_data: dict, url: str) -> list[dict]:
+    """Equivalent books on other supported sites, fastest first.
+
+    Candidates come from the ``SEARCHERS`` sites and must match title and
+    author and have the same number of chapters, so chapter N on a mirror
+    is chapter N of this book.
+    """
+    key = title_key(book_data.get("title"))
+    if not key:
+        return []
+    author = book_data.get("author")
+    site = book_data.get("site")
+    # Some sites share a searcher (e.g. goldenaudiobook .net/.com)
+    searchers = {
+        searcher for name, searcher in SEARCHERS.items() if name != site
+    }
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = [
+            r
+            for site_results in executor.map(
+                lambda s: _search_site(s, book_data["title"]), searchers
+            )
+            for r in site_results
+        ]
+        candidates = list(dict.fromkeys(
+            r.url for r in results
+            # Search results rarely name the author; _resolve checks the chapter count
+            if r.url != url
+            and title_key(r.title) == key
+            and not authors_conflict(author, r.author)
+        ))
+        chapter_count = len(book_data["chapters"])
+        mirrors = [
+            m for m in executor.map(lambda u: _resolve(u, chapter_count), candidates) if m
+        ]
+        rates = list(executor.map(probe_rate, mirrors))
+
+    ranked = [
+        (rate, mirror) for rate, mirror in zip(rates, mirrors) if rate is None or rate > 0
+    ]
+    # Unmeasured (tokybook) mirrors go after measured ones
+    ranked.sort(key=lambda pair: -1 if pair[0] is None else pair[0], reverse=True)
+    for rate, mirror in ranked:
+        mirror["probe_rate"] = rate
+    return [mirror for _, mirror in ranked]
+
+
+class MirrorSet:
+    """The sources a book can be downloaded from; mirrors are looked up on first failover."""
+
+    def __init__(self, book_data: dict, url: str):
+        self.current = book_data
+        self._url = url
+        self._mirrors: list[dict] | None = None
+
+    async def failover(self, min_rate: float | None = None) -> dict | None:
+        """Switch to the next best mirror and return it, or None if there is none.
+
+        With ``min_rate`` (bytes/second) only a mirror that probed faster is
+        taken, for switching away from a slow but working source.
+        """
+        if self._mirrors is None:
+            loop = asyncio.get_event_loop()
+            self._mirrors = await loop.run_in_executor(
+                None, find_mirrors, self.current, self._url
+            )
+        for mirror in self._mirrors:
+            rate = mirror.get("probe_rate")
+            if min_rate is not None and (rate is None or rate <= min_rate):
+                continue
+            self._mirrors.remove(mirror)
+            self.current = mirror
+            return mirror
+        return None
@@ -0,0 +1,25 @@
+import base64
+import json
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(key, item_id: int) -> str:
+    """Opaque cursor for keyset pagination on ``(key, id)``."""
+    raw = json.dumps([key, item_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key_type: type | tuple[type, ...]) -> tuple:
+    """``(key, id)`` from ``encode_cursor``, raising ``InvalidCursorError`` if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key, item_id = json.loads(raw)
+        item_id = int(item_id)
+    except (ValueError, TypeError):
+        raise InvalidCursorError("Invalid cursor")
+    if not isinstance(key, key_type):
+        raise InvalidCursorError("Invalid cursor")
+    return key, item_id
@@ -0,0 +1,224 @@
+import asyncio
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import select, update
+
+from app.config import settings
+from app.database import async_session_maker
+from app.models import BookManifest, QueueItem
+from app.services.dedup import title_key
+from app.services.manifest import save_manifest
+from app.services.progress_tracker import progress_tracker
+from app.services.tagging import fetch_cover
+from scrapers import get_scraper
+
+
+@dataclass
+class PrefetchedBook:
+    book_data: dict
+    artwork_data: bytes | None
+    mime_type: str | None
+    fetched_at: float
+
+    def expired(self) -> bool:
+        # Chapter URLs and stream tokens don't stay valid forever
+        return time.monotonic() - self.fetched_at > settings.prefetch_ttl
+
+
+class MetadataPrefetcher:
+    """Resolves book data and covers for the next pending items.
+
+    Runs while the current book downloads, so the worker can start the
+    next one without a fetching phase; titles and chapter counts are
+    written to the queue as soon as they are known.
+    """
+
+    def __init__(self):
+        self._books: dict[int, PrefetchedBook] = {}
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._scan: asyncio.Task | None = None
+        self._resolving: set[asyncio.Task] = set()
+        # Items queued or running in resolve(), which the prefetcher leaves alone
+        self._resolve_ids: set[int] = set()
+        self._resolve_slots: asyncio.Semaphore | None = None
+
+    def schedule(self):
+        """Start prefetching the upcoming pending items (no-op if already scanning)."""
+        if settings.prefetch_count <= 0 or (self._scan and not self._scan.done()):
+            return
+        self._scan = asyncio.create_task(self._fill())
+
+    def _drop_expired(self):
+        # Books for items claimed by another worker, or removed before they
+        # ran, are never taken; drop them once they are no use anyway
+        for queue_id in [q for q, book in self._books.items() if book.expired()]:
+            del self._books[queue_id]
+
+    async def _fill(self):
+        self._drop_expired()
+        async with async_session_maker() as db:
+            result = await db.execute(
+                select(QueueItem.id, QueueItem.url)
+                .where(QueueItem.status == "pending")
+                .order_by(
+                    QueueItem.priority.desc(), QueueItem.fair_seq, QueueItem.created_at
+                )
+                .limit(settings.prefetch_count)
+            )
+            upcoming = result.all()
+            # Items with a stored manifest (retries) don't need scraping
+            result = await db.execute(
+                select(BookManifest.queue_id).where(
+                    BookManifest.queue_id.in_([queue_id for queue_id, _ in upcoming])
+                )
+            )
+            has_manifest = set(result.scalars().all())
+
+        for queue_id, url in upcoming:
+            if queue_id in has_manifest or queue_id in self._resolve_ids:
+                continue
+            book = self._books.get(queue_id)
+            if queue_id in self._tasks or (book and not book.expired()):
+                continue
+            task = asyncio.create_task(self._prefetch(queue_id, url))
+            self._tasks[queue_id] = task
+            task.add_done_callback(lambda _, queue_id=queue_id: self._tasks.pop(queue_id, None))
+
+    async def _prefetch(self, queue_id: int, url: str):
+        scraper = get_scraper(url)
+        if not scraper:
+            return
+        loop = asyncio.get_event_loop()
+        try:
+            book_data = await loop.run_in_executor(None, scraper.fetch_book_data, url)
+            if not book_data:
+                return
+            artwork_data, mime_type = await loop.run_in_executor(
+                None, fetch_cover, book_data.get("cover_url")
+            )
+        except Exception as e:
+            # The worker fetches (and reports errors) itself
+            print(f"Prefetch failed for queue item {queue_id}: {e}")
+            return
+
+        self._books[queue_id] = PrefetchedBook(
+            book_data, artwork_data, mime_type, time.monotonic()
+        )
+        await self._store_metadata(queue_id, book_data)
+
+    async def _store_metadata(self, queue_id: int, book_data: dict, manifest: bool = False) -> bool:
+        """Write scraped metadata to a still pending item, optionally saving a manifest too.
+
+        Returns False if the item was claimed or removed in the meantime.
+        """
+        total_chapters = len(book_data.get("chapters", []))
+        async with async_session_maker() as db:
+            result = await db.execute(
+                update(QueueItem)
+                .where(QueueItem.id == queue_id, QueueItem.status == "pending")
+                .values(
+                    title=book_data.get("title"),
+                    title_key=title_key(book_data.get("title")),
+                    author=book_data.get("author"),
+                    narrator=book_data.get("narrator"),
+                    site=book_data.get("site"),
+                    cover_url=book_data.get("cover_url"),
+                    total_chapters=total_chapters,
+                )
+                .returning(QueueItem.id)
+            )
+            if result.scalar_one_or_none() is None:
+                return False
+            if manifest:
+                await save_manifest(db, queue_id, book_data)
+            await db.commit()
+        await progress_tracker.queue_update(
+            queue_id,
+            "pending",
+            title=book_data.get("title"),
+            total_chapters=total_chapters,
+        )
+        return True
+
+    def resolve(self, items: list[tuple[int, str]]):
+        """Scrape metadata for ``(queue_id, url)`` items in the background, a few at a time.
+
+        Meant for bulk imports: titles show up long before the worker gets
+        to an item. The stored manifests spare the prefetcher from scraping
+        again, and the worker only refreshes what expires (for tokybook, the
+        stream token).
+        """
+        if self._resolve_slots is None:
+            self._resolve_slots = asyncio.Semaphore(settings.import_resolve_concurrency)
+        for queue_id, url in items:
+            if queue_id in self._resolve_ids:
+                continue
+            self._resolve_ids.add(queue_id)
+            task = asyncio.create_task(self._resolve(queue_id, url))
+            self._resolving.add(task)
+            task.add_done_callback(self._resolving.discard)
+            task.add_done_callback(lambda _, queue_id=queue_id: self._resolve_ids.discard(queue_id))
+
+    async def _resolve(self, queue_id: int, url: str):
+        scraper = get_scraper(url)
+        if not scraper:
+            return
+        async with self._resolve_slots:
+            if queue_id in self._tasks or queue_id in self._books:
+                return
+            # The worker may have claimed it while this waited for a slot
+            async with async_session_maker() as db:
+                item_status = await db.scalar(
+                    select(QueueItem.status).where(QueueItem.id == queue_id)
+                )
+            if item_status != "pending":
+                return
+            # Registered like a prefetch, so a worker claiming the item now
+            # waits for this lookup in take() instead of scraping again
+            self._tasks[queue_id] = asyncio.current_task()
+            try:
+                await self._lookup(scraper, queue_id, url)
+            finally:
+                self._tasks.pop(queue_id, None)
+
+    async def _lookup(self, scraper, queue_id: int, url: str):
+        loop = asyncio.get_event_loop()
+        try:
+            book_data = await loop.run_in_executor(None, scraper.fetch_book_data, url)
+        except Exception as e:
+            print(f"Metadata lookup failed for queue item {queue_id}: {e}")
+            return
+        if not book_data or await self._store_metadata(queue_id, book_data, manifest=True):
+            return
+        if not settings.run_embedded_worker:
+            # The claim came from a separate worker process, which can't take() it
+            return
+        # Claimed meanwhile: hand the result to the worker, cover included
+        try:
+            artwork_data, mime_type = await loop.run_in_executor(
+                None, fetch_cover, book_data.get("cover_url")
+            )
+        except Exception:
+            artwork_data, mime_type = None, None
+        self._drop_expired()
+        self._books[queue_id] = PrefetchedBook(
+            book_data, artwork_data, mime_type, time.monotonic()
+        )
+
+    async def take(self, queue_id: int) -> PrefetchedBook | None:
+        """Prefetched data for an item, waiting for an in-flight prefetch."""
+        task = self._tasks.get(queue_id)
+        if task:
+            await asyncio.shield(task)
+        book = self._books.pop(queue_id, None)
+        if book and book.expired():
+            return None
+        return book
+
+    def discard(self, queue_id: int):
+        self._books.pop(queue_id, None)
+
+
+# Global singleton
+metadata_prefetcher = MetadataPrefetcher()
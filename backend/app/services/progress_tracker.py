@@ -1,33 +1,210 @@
 import asyncio
 import json
-from typing import Any
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable
+
+from app.config import settings
+from app.services.event_bus import InMemoryEventBackend
+
+
+# Events describing where an item ended up; never coalesced or dropped
+TERMINAL_EVENTS = ("download_complete", "download_error")
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+# Items kept in the live state table; finished ones are pruned first
+STATE_LIMIT = 500
+
+
+def _coalesce_key(event_type: str, data: dict[str, Any]) -> tuple | None:
+    """Key under which a newer event replaces an older queued one, or None."""
+    if event_type in TERMINAL_EVENTS or data.get("status") in TERMINAL_STATUSES:
+        return None
+    if "queue_id" not in data:
+        return None
+    return (event_type, data["queue_id"])
+
+
+class Subscriber:
+    """Bounded event buffer for one SSE connection.
+
+    Non-terminal events are coalesced per (type, queue_id): a newer one
+    replaces the queued one and moves to the back, so a slow client only
+    ever holds the latest state of each item and still receives event ids
+    in increasing order. Terminal events are always kept; a client
+    that lets more than ``max_events`` pile up is evicted and must
+    reconnect.
+    """
+
+    def __init__(self, max_events: int):
+        self.max_events = max_events
+        self.evicted = False
+        self._events: OrderedDict[Any, dict] = OrderedDict()
+        self._ready = asyncio.Event()
+        self._seq = 0
+
+    def push(self, message: dict) -> bool:
+        """Queue a message; returns False if it replaced an older one."""
+        key = message["key"]
+        if key is not None and key in self._events:
+            # Not in place: the newer id must not overtake events queued after the old one
+            del self._events[key]
+            self._events[key] = message
+            return False
+        if key is None:
+            self._seq += 1
+            key = self._seq
+        self._events[key] = message
+        if len(self._events) > self.max_events:
+            self.evicted = True
+            self._events.clear()
+        self._ready.set()
+        return True
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    async def get(self, timeout: float) -> dict | None:
+        """Next message, or None on timeout or eviction."""
+        if not self._events and not self.evicted:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return None
+        if self.evicted or not self._events:
+            return None
+        _, message = self._events.popitem(last=False)
+        return message
 
 
 class ProgressTracker:
-    def __init__(self):
-        self._subscribers: set[asyncio.Queue] = set()
-        self._lock = asyncio.Lock()
+    def __init__(self, max_progress_rate: float = 4.0, buffer_size: int | None = None):
+        # Replaced (not mutated) on subscribe/unsubscribe, so broadcasting
+        # iterates a stable tuple without locking
+        self._subscribers: tuple[Subscriber, ...] = ()
+        self.buffer_size = buffer_size or settings.sse_buffer_size
+        # download_progress events per item are limited to this many per second
+        self.max_progress_rate = max_progress_rate
+        self._last_progress: dict[int, float] = {}
+        self._reporters: dict[int, ProgressReporter] = {}
+        self._stats = {
+            "events_broadcast": 0,
+            "events_coalesced": 0,
+            "subscribers_evicted": 0,
+        }
+        # Sequence-numbered recent events (for Last-Event-ID replay) and the
+        # latest known state of each item (for snapshots)
+        self._seq = 0
+        self._history: deque[dict] = deque(maxlen=settings.event_history_size)
+        self._states: dict[int, dict] = {}
+        self.backend = InMemoryEventBackend(self._deliver)
+
+    async def subscribe(self, last_event_id: int | None = None) -> Subscriber:
+        """Register a connection, pre-filled with what it needs to catch up.
+
+        A reconnecting client (``last_event_id``) gets just the events it
+        missed if they are still buffered; anyone else gets a snapshot of
+        every item's current state.
+        """
+        subscriber = Subscriber(self.buffer_size)
+        missed = self._missed_since(last_event_id)
+        if missed is None:
+            subscriber.push(self._snapshot_message())
+        else:
+            for message in missed:
+                subscriber.push(message)
+        self._subscribers = (*self._subscribers, subscriber)
+        return subscriber
+
+    def _missed_since(self, last_event_id: int | None) -> list[dict] | None:
+        if last_event_id is None or last_event_id > self._seq:
+            # New client, or ids from before a restart
+            return None
+        # Subscribers deliver ids in increasing order (see Subscriber.push), so
+        # a client that saw last_event_id has seen every event up to it
+        missed = [m for m in self._history if m["id"] > last_event_id]
+        oldest = self._history[0]["id"] if self._history else self._seq + 1
+        if oldest > last_event_id + 1 or len(missed) > self.buffer_size:
+            # Gap no longer covered by the buffer
+            return None
+        return missed
 
-    async def subscribe(self) -> asyncio.Queue:
-        queue: asyncio.Queue = asyncio.Queue()
-        async with self._lock:
-            self._subscribers.add(queue)
-        return queue
+    def _snapshot_message(self) -> dict:
+        return {
+            "id": self._seq,
+            "type": "snapshot",
+            "data": json.dumps({"items": list(self._states.values())}),
+            "key": None,
+        }
+
+    def _update_state(self, event_type: str, data: dict[str, Any]):
+        queue_id = data.get("queue_id")
+        if queue_id is None:
+            return
+        state = self._states.setdefault(queue_id, {"queue_id": queue_id})
+        if event_type == "download_complete":
+            state.update(status="completed", title=data.get("title"))
+        elif event_type == "download_error":
+            state.update(status="failed", error_message=data.get("error"))
+        else:
+            state.update(data)
+
+        if len(self._states) > STATE_LIMIT:
+            finished = [
+                qid for qid, s in self._states.items()
+                if s.get("status") in TERMINAL_STATUSES
+            ]
+            for qid in finished[:len(self._states) - STATE_LIMIT]:
+                del self._states[qid]
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers = tuple(s for s in self._subscribers if s is not subscriber)
+
+    async def start(self, backend=None):
+        """Switch to ``backend`` (see ``event_bus``) and start receiving from it."""
+        if backend is not None:
+            await self.backend.stop()
+            self.backend = backend
+        await self.backend.start(self._deliver)
 
-    def unsubscribe(self, queue: asyncio.Queue):
-        self._subscribers.discard(queue)
+    async def stop(self):
+        await self.backend.stop()
 
     async def broadcast(self, event_type: str, data: dict[str, Any]):
+        await self.backend.publish(event_type, data)
+
+    def _deliver(self, seq: int, event_type: str, data: dict[str, Any]):
+        """Record an event from the backend and fan it out to local subscribers."""
+        self._seq = seq
         message = {
+            "id": seq,
             "type": event_type,
             "data": json.dumps(data),
+            "key": _coalesce_key(event_type, data),
+        }
+        self._history.append(message)
+        self._update_state(event_type, data)
+        self._stats["events_broadcast"] += 1
+        for subscriber in self._subscribers:
+            if subscriber.evicted:
+                continue
+            if not subscriber.push(message):
+                self._stats["events_coalesced"] += 1
+            elif subscriber.evicted:
+                self._stats["subscribers_evicted"] += 1
+
+    def metrics(self) -> dict:
+        subscribers = self._subscribers
+        return {
+            "subscribers": len(subscribers),
+            "buffer_size": self.buffer_size,
+            "max_buffered": max((len(s) for s in subscribers), default=0),
+            "last_event_id": self._seq,
+            "tracked_items": len(self._states),
+            **self._stats,
         }
-        async with self._lock:
-            for queue in self._subscribers:
-                try:
-                    queue.put_nowait(message)
-                except asyncio.QueueFull:
-                    pass  # Skip if queue is full
 
     async def queue_update(self, queue_id: int, status: str, **kwargs):
         await self.broadcast(
@@ -42,7 +219,9 @@ class ProgressTracker:
         total_chapters: int,
         message: str | None = None,
         eta_seconds: int | None = None,
+        **stats,
     ):
+        self._last_progress[queue_id] = time.monotonic()
         await self.broadcast(
             "download_progress",
             {
@@ -51,9 +230,26 @@ class ProgressTracker:
                 "total_chapters": total_chapters,
                 "message": message,
                 "eta_seconds": eta_seconds,
+                **stats,
             },
         )
 
+    def progress_reporter(
+        self, queue_id: int, snapshot: Callable[[], dict]
+    ) -> "ProgressReporter":
+        """Coalescing reporter for high-frequency progress; see ``ProgressReporter``."""
+        self.forget(queue_id)
+        reporter = ProgressReporter(self, queue_id, snapshot)
+        self._reporters[queue_id] = reporter
+        return reporter
+
+    def forget(self, queue_id: int):
+        """Drop an item's rate-limit state and stop its reporter, if any."""
+        self._last_progress.pop(queue_id, None)
+        reporter = self._reporters.pop(queue_id, None)
+        if reporter:
+            reporter.closed = True
+
     async def download_complete(self, queue_id: int, title: str):
         await self.broadcast(
             "download_complete",
@@ -67,5 +263,42 @@ class ProgressTracker:
         )
 
 
+class ProgressReporter:
+    """Thread-safe callable for progress reported per chunk by transfer threads.
+
+    Calls are coalesced: at most ``max_progress_rate`` download_progress
+    events per second are broadcast for the item, each built from
+    ``snapshot()`` (the keyword arguments of ``download_progress``) when it
+    is sent. Must be created on the event loop.
+    """
+
+    def __init__(self, tracker: ProgressTracker, queue_id: int, snapshot: Callable[[], dict]):
+        self.tracker = tracker
+        self.queue_id = queue_id
+        self.snapshot = snapshot
+        self.closed = False
+        self._loop = asyncio.get_running_loop()
+        self._lock = threading.Lock()
+        self._scheduled = False
+
+    def __call__(self):
+        with self._lock:
+            if self._scheduled or self.closed:
+                return
+            self._scheduled = True
+        self._loop.call_soon_threadsafe(self._schedule)
+
+    def _schedule(self):
+        last = self.tracker._last_progress.get(self.queue_id, 0.0)
+        delay = max(0.0, last + 1 / self.tracker.max_progress_rate - time.monotonic())
+        self._loop.call_later(delay, lambda: asyncio.ensure_future(self._send()))
+
+    async def _send(self):
+        with self._lock:
+            self._scheduled = False
+        if not self.closed:
+            await self.tracker.download_progress(self.queue_id, **self.snapshot())
+
+
 # Global singleton
 progress_tracker = ProgressTracker()
@@ -0,0 +1,49 @@
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import QueueItem
+from app.services.dedup import save_chapter_files
+from app.services.manifest import mark_chapters
+
+
+class ProgressWriter:
+    """Coalesces a download's progress writes into one commit per interval.
+
+    ``current_chapter`` and finished-chapter records accumulate in memory and
+    are written together, so a book costs a handful of commits rather than
+    several per chapter. Call ``flush`` before any terminal status change.
+    """
+
+    def __init__(self, db: AsyncSession, item: QueueItem, interval: float | None = None):
+        self.db = db
+        self.item = item
+        self.interval = settings.progress_flush_interval if interval is None else interval
+        self._chapter_files: list[dict] = []
+        self._last_flush = time.monotonic()
+
+    async def chapter_done(
+        self,
+        chapter: int,
+        path: str | None = None,
+        verification: dict | None = None,
+    ):
+        self.item.current_chapter = chapter
+        if verification is not None:
+            self._chapter_files.append({
+                "queue_id": self.item.id,
+                "chapter": chapter,
+                "path": path,
+                **verification,
+            })
+        if time.monotonic() - self._last_flush >= self.interval:
+            await self.flush()
+
+    async def flush(self):
+        if self._chapter_files:
+            await save_chapter_files(self.db, self._chapter_files)
+            await mark_chapters(self.db, self.item.id, self._chapter_files)
+            self._chapter_files = []
+        await self.db.commit()
+        self._last_flush = time.monotonic()
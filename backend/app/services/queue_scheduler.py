@@ -0,0 +1,118 @@
+from datetime import datetime
+
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import QueueItem
+from app.services.heartbeat import WORKER_ID
+
+
+def site_of(normalized_url: str | None) -> str:
+    """Host part of a normalized URL (see ``dedup.normalize_url``)."""
+    return (normalized_url or "").split("/", 1)[0].split("?", 1)[0]
+
+
+async def assign_fair_seq(db: AsyncSession, normalized_urls: list[str]) -> list[int]:
+    """Round-robin positions across sites for new items with these URLs.
+
+    Each site's items get consecutive sequence numbers starting no earlier
+    than the oldest pending one, so a batch of 50 books from one site is
+    interleaved with items from other sites instead of blocking them. The
+    claim orders by ``fair_seq`` within a priority, keeping this a plain
+    index scan.
+    """
+    virtual_time = await db.scalar(
+        select(func.min(QueueItem.fair_seq)).where(QueueItem.status == "pending")
+    ) or 0
+
+    seqs = []
+    next_seq: dict[str, int] = {}
+    for normalized_url in normalized_urls:
+        site = site_of(normalized_url)
+        if site not in next_seq:
+            last = await db.scalar(
+                select(func.max(QueueItem.fair_seq)).where(
+                    QueueItem.status == "pending",
+                    or_(
+                        QueueItem.normalized_url == site,
+                        QueueItem.normalized_url.like(f"{site}/%"),
+                        QueueItem.normalized_url.like(f"{site}?%"),
+                    ),
+                )
+            )
+            next_seq[site] = max(virtual_time, last + 1 if last is not None else 0)
+        seqs.append(next_seq[site])
+        next_seq[site] += 1
+    return seqs
+
+
+async def enqueue_urls(
+    db: AsyncSession,
+    urls: dict[str, str],
+    priority: int = 0,
+    allow_duplicate: bool = False,
+) -> list[QueueItem]:
+    """Insert pending items for ``{normalized_url: url}`` in a single ``INSERT ... RETURNING``.
+
+    Leaves committing to the caller.
+    """
+    if not urls:
+        return []
+    seqs = await assign_fair_seq(db, list(urls))
+    result = await db.scalars(
+        insert(QueueItem).returning(QueueItem),
+        [
+            {
+                "url": url,
+                "normalized_url": normalized,
+                "allow_duplicate": allow_duplicate,
+                "priority": priority,
+                "fair_seq": seq,
+                "status": "pending",
+            }
+            for (normalized, url), seq in zip(urls.items(), seqs)
+        ],
+    )
+    # RETURNING order isn't guaranteed for multi-row inserts; ids follow the input
+    return sorted(result.all(), key=lambda item: item.id)
+
+
+async def claim_next_item(db: AsyncSession) -> QueueItem | None:
+    """Atomically take the next pending item and lease it to this worker.
+
+    A single ``UPDATE ... WHERE id = (SELECT ... LIMIT 1) RETURNING`` served
+    by the ``ix_queue_claim`` index, so two workers can never claim the same
+    item and the cost doesn't grow with the queue.
+    """
+    next_id = (
+        select(QueueItem.id)
+        .where(QueueItem.status == "pending")
+        .order_by(
+            QueueItem.priority.desc(), QueueItem.fair_seq, QueueItem.created_at
+        )
+        .limit(1)
+        .scalar_subquery()
+    )
+    now = datetime.utcnow()
+    result = await db.execute(
+        update(QueueItem)
+        .where(QueueItem.id == next_id, QueueItem.status == "pending")
+        .values(
+            status="fetching",
+            started_at=now,
+            attempts=QueueItem.attempts + 1,
+            worker_id=WORKER_ID,
+            heartbeat_at=now,
+        )
+        .returning(QueueItem)
+    )
+    item = result.scalar_one_or_none()
+    await db.commit()
+    return item
+
+
+async def top_priority(db: AsyncSession) -> int:
+    """Highest priority among pending items."""
+    return await db.scalar(
+        select(func.max(QueueItem.priority)).where(QueueItem.status == "pending")
+    ) or 0
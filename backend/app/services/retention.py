@@ -0,0 +1,206 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, delete, func, insert, select, text, update
+
+from app.config import settings
+from app.database import async_session_maker, engine
+from app.models import ArchivedQueueItem, BookManifest, QueueItem
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+# Rows removed per transaction, so the worker and API never wait long on the write lock
+BATCH_SIZE = 500
+
+# Delay before the first pass, to stay out of the way of startup
+STARTUP_DELAY = 300
+
+# Free pages handed back to the filesystem per incremental vacuum step
+VACUUM_PAGES = 2000
+
+TRUNCATED = " [truncated]"
+
+
+def _compacted(column):
+    """SQL for ``column`` cut to ``error_message_max_length`` characters."""
+    limit = settings.error_message_max_length
+    return case(
+        (
+            func.length(column) > limit,
+            func.substr(column, 1, limit - len(TRUNCATED)).concat(TRUNCATED),
+        ),
+        else_=column,
+    )
+
+
+async def _database_bytes(conn) -> int:
+    page_count = (await conn.execute(text("PRAGMA page_count"))).scalar()
+    page_size = (await conn.execute(text("PRAGMA page_size"))).scalar()
+    return page_count * page_size
+
+
+async def _is_quiet() -> bool:
+    """Nothing is downloading, so maintenance won't hold up progress writes."""
+    async with async_session_maker() as db:
+        busy = await db.scalar(
+            select(func.count())
+            .select_from(QueueItem)
+            .where(QueueItem.status.in_(("fetching", "downloading")))
+        )
+    return not busy
+
+
+async def expire_queue_items() -> dict:
+    """Archive or delete finished items older than ``queue_retention_days``; compact the rest."""
+    report = {"archived": 0, "deleted": 0, "compacted": 0}
+    async with async_session_maker() as db:
+        result = await db.execute(
+            update(QueueItem)
+            .where(
+                QueueItem.status.in_(FINISHED_STATUSES),
+                func.length(QueueItem.error_message) > settings.error_message_max_length,
+            )
+            # Housekeeping, not a change clients need to see
+            .values(
+                error_message=_compacted(QueueItem.error_message),
+                updated_at=QueueItem.updated_at,
+            )
+        )
+        report["compacted"] = result.rowcount
+        await db.commit()
+
+    if settings.queue_retention_days <= 0:
+        return report
+
+    cutoff = datetime.utcnow() - timedelta(days=settings.queue_retention_days)
+    finished_at = func.coalesce(
+        QueueItem.completed_at, QueueItem.updated_at, QueueItem.created_at
+    )
+    while True:
+        async with async_session_maker() as db:
+            ids = (
+                await db.scalars(
+                    select(QueueItem.id)
+                    .where(
+                        QueueItem.status.in_(FINISHED_STATUSES),
+                        finished_at < cutoff,
+                    )
+                    .limit(BATCH_SIZE)
+                )
+            ).all()
+            if not ids:
+                break
+            if settings.queue_archive:
+                # Completed books are also in the download history; the archive
+                # keeps failures and cancellations on record
+                columns = ("id", "url", "title", "author", "status", "error_message",
+                           "created_at", "completed_at")
+                await db.execute(
+                    insert(ArchivedQueueItem).from_select(
+                        columns,
+                        select(
+                            QueueItem.id,
+                            QueueItem.url,
+                            QueueItem.title,
+                            QueueItem.author,
+                            QueueItem.status,
+                            _compacted(QueueItem.error_message),
+                            QueueItem.created_at,
+                            finished_at,
+                        ).where(QueueItem.id.in_(ids)),
+                    )
+                )
+                report["archived"] += len(ids)
+            await db.execute(delete(BookManifest).where(BookManifest.queue_id.in_(ids)))
+            await db.execute(delete(QueueItem).where(QueueItem.id.in_(ids)))
+            await db.commit()
+        report["deleted"] += len(ids)
+        await asyncio.sleep(0)
+    return report
+
+
+async def compact_database(analyze: bool) -> int:
+    """Return free pages to the filesystem and refresh planner statistics.
+
+    The first run switches the database to incremental auto-vacuum, which
+    takes one full ``VACUUM``. Returns the bytes reclaimed.
+    """
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        before = await _database_bytes(conn)
+        if (await conn.execute(text("PRAGMA auto_vacuum"))).scalar() != 2:
+            print("Enabling incremental auto-vacuum (one-time full VACUUM)")
+            await conn.execute(text("PRAGMA auto_vacuum=INCREMENTAL"))
+            await conn.execute(text("VACUUM"))
+        else:
+            # The sqlite3 module steps a statement without result columns only
+            # once, freeing a single page; a script runs it to completion
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.executescript(f"PRAGMA incremental_vacuum({VACUUM_PAGES});")
+        if analyze:
+            await conn.execute(text("ANALYZE"))
+        return before - await _database_bytes(conn)
+
+
+class RetentionJob:
+    """Periodically expires old queue items and compacts the database.
+
+    Expiry runs in short batches at any time; vacuuming and ``ANALYZE``
+    wait for a pass where nothing is downloading. ``last_report`` keeps the
+    outcome of the latest pass for the metrics endpoint.
+    """
+
+    def __init__(self):
+        self.last_report: dict | None = None
+        self._task: asyncio.Task | None = None
+        self._pending_compaction = True
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        await asyncio.sleep(min(STARTUP_DELAY, settings.retention_interval))
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Retention job error: {e}")
+            await asyncio.sleep(settings.retention_interval)
+
+    async def run_once(self) -> dict:
+        started = time.monotonic()
+        report = await expire_queue_items()
+        if report["deleted"] or report["compacted"]:
+            self._pending_compaction = True
+
+        report["bytes_reclaimed"] = 0
+        report["vacuumed"] = False
+        if self._pending_compaction and await _is_quiet():
+            report["bytes_reclaimed"] = await compact_database(analyze=report["deleted"] > 0)
+            report["vacuumed"] = True
+            self._pending_compaction = False
+
+        report["finished_at"] = datetime.utcnow().isoformat()
+        report["duration_seconds"] = round(time.monotonic() - started, 3)
+        self.last_report = report
+        if report["deleted"] or report["compacted"] or report["bytes_reclaimed"]:
+            print(
+                f"Retention: archived {report['archived']}, deleted {report['deleted']}, "
+                f"compacted {report['compacted']} queue item(s); "
+                f"reclaimed {report['bytes_reclaimed'] // 1024} KiB"
+            )
+        return report
+
+
+# Global singleton
+retention_job = RetentionJob()
@@ -0,0 +1,206 @@
+import io
+import subprocess
+
+import requests
+from mutagen.id3 import (
+    ID3,
+    APIC,
+    TALB,
+    TPE1,
+    TPE2,
+    TCON,
+    TDRC,
+    TRCK,
+    TIT2,
+)
+
+from app.config import settings
+
+# Room left in every chapter tag so later edits don't have to move the audio
+TAG_PADDING = 2048
+
+
+def fetch_cover(url: str | None) -> tuple[bytes | None, str | None]:
+    """Download cover art; returns (None, None) if it isn't a usable image."""
+    if not url:
+        return None, None
+    try:
+        response = requests.get(url, timeout=10)
+        response.raise_for_status()
+    except Exception:
+        return None, None
+    content_type = response.headers.get("Content-Type", "")
+    if not content_type.startswith("image/"):
+        return None, None
+    return response.content, "image/jpeg" if "jpeg" in content_type else "image/png"
+
+
+def prepare_cover(data: bytes, mime_type: str) -> tuple[bytes | None, str | None]:
+    """Downscale and recompress cover art to a bounded JPEG.
+
+    Falls back to the original image if FFmpeg is unavailable, as long as it
+    already fits within ``cover_max_bytes``.
+    """
+    max_dim = settings.cover_max_dimension
+    scale = (
+        f"scale='min({max_dim},iw)':'min({max_dim},ih)'"
+        ":force_original_aspect_ratio=decrease"
+    )
+    for quality in (3, 6, 10):
+        try:
+            proc = subprocess.run(
+                [
+                    "ffmpeg",
+                    "-loglevel", "error",
+                    "-i", "pipe:0",
+                    "-vf", scale,
+                    "-frames:v", "1",
+                    "-q:v", str(quality),
+                    "-f", "mjpeg",
+                    "pipe:1",
+                ],
+                input=data,
+                capture_output=True,
+                check=True,
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"Cover processing failed: {e}")
+            break
+        if proc.stdout and len(proc.stdout) <= settings.cover_max_bytes:
+            return proc.stdout, "image/jpeg"
+
+    if len(data) <= settings.cover_max_bytes:
+        return data, mime_type
+    return None, None
+
+
+class BookTag:
+    """ID3 frames built once per book and rendered per chapter."""
+
+    def __init__(
+        self,
+        album: str,
+        author: str | None = None,
+        narrator: str | None = None,
+        year: str | None = None,
+        cover_data: bytes | None = None,
+        cover_mime: str | None = None,
+    ):
+        self.album = album
+        self.author = author
+        self.narrator = narrator
+        self.year = year
+        self.cover_data = cover_data
+        self.cover_mime = cover_mime
+
+        self._frames = [
+            TALB(encoding=3, text=album),
+            TCON(encoding=3, text="Audiobook"),
+        ]
+        if author:
+            self._frames.append(TPE1(encoding=3, text=author))
+        if narrator:
+            self._frames.append(TPE2(encoding=3, text=narrator))
+        if year:
+            self._frames.append(TDRC(encoding=3, text=year))
+        if cover_data and cover_mime:
+            self._frames.append(APIC(
+                encoding=3,
+                mime=cover_mime,
+                type=3,
+                desc="Cover",
+                data=cover_data,
+            ))
+
+    @classmethod
+    def from_book(
+        cls,
+        book_data: dict,
+        album: str,
+        artwork_data: bytes | None = None,
+        mime_type: str | None = None,
+    ) -> "BookTag":
+        cover_data, cover_mime = None, None
+        if artwork_data and mime_type:
+            cover_data, cover_mime = prepare_cover(artwork_data, mime_type)
+        return cls(
+            album=album,
+            author=book_data.get("author"),
+            narrator=book_data.get("narrator"),
+            year=book_data.get("year"),
+            cover_data=cover_data,
+            cover_mime=cover_mime,
+        )
+
+    def render(self, track: int, total: int, title: str) -> bytes:
+        """Serialize a complete ID3v2.3 tag (header, frames, padding) for one chapter."""
+        tag = ID3()
+        for frame in self._frames:
+            tag.add(frame)
+        tag.add(TRCK(encoding=3, text=f"{track}/{total}"))
+        tag.add(TIT2(encoding=3, text=title))
+
+        buf = io.BytesIO()
+        tag.save(buf, v2_version=3, padding=lambda info: TAG_PADDING)
+        return buf.getvalue()
+
+    def ffmpeg_args(self, track: int, total: int, title: str) -> list[str]:
+        """Output options that make FFmpeg write the same tag while encoding.
+
+        Expects the cover (if any) as the second input, fed via ``pipe:0``.
+        """
+        metadata = {
+            "album": self.album,
+            "genre": "Audiobook",
+            "track": f"{track}/{total}",
+            "title": title,
+            "artist": self.author,
+            "album_artist": self.narrator,
+            "date": self.year,
+        }
+        args = ["-map", "0:a", "-map_metadata", "-1"]
+        if self.cover_data:
+            args += [
+                "-map", "1:v",
+                "-c:v", "copy",
+                "-disposition:v", "attached_pic",
+                "-metadata:s:v", "title=Cover",
+                "-metadata:s:v", "comment=Cover (front)",
+            ]
+        for key, value in metadata.items():
+            if value:
+                args += ["-metadata", f"{key}={value}"]
+        args += ["-id3v2_version", "3"]
+        return args
+
+
+def strip_leading_id3(chunks):
+    """Drop an ID3v2 tag at the start of a byte stream, yielding the remaining audio."""
+    head = b""
+    chunks = iter(chunks)
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= 10:
+            break
+
+    if len(head) < 10 or not head.startswith(b"ID3"):
+        if head:
+            yield head
+        yield from chunks
+        return
+
+    # Size is a 28-bit syncsafe integer, excluding the 10-byte header (and footer)
+    size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+    size += 20 if head[5] & 0x10 else 10
+
+    remaining = size - len(head)
+    if remaining < 0:
+        yield head[size:]
+    else:
+        for chunk in chunks:
+            if remaining >= len(chunk):
+                remaining -= len(chunk)
+                continue
+            yield chunk[remaining:]
+            break
+    yield from chunks
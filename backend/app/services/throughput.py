@@ -0,0 +1,84 @@
+import threading
+import time
+
+# Weight of the newest sample in the smoothed throughput
+EWMA_ALPHA = 0.3
+SAMPLE_INTERVAL = 1.0
+
+
+class ThroughputMeter:
+    """Byte-level progress of one download, fed from the transfer threads.
+
+    The rate is sampled about once a second and smoothed with an EWMA, so
+    the ETA follows real throughput instead of chapter counts.
+
+    Progress counts bytes transferred. Part sizes known up front may be in
+    another unit (tokybook sends TS segments but is estimated in MP3 bytes
+    from durations), so ``finish_part`` swaps each estimate for the bytes
+    the part actually took and scales the remaining estimates to match.
+    """
+
+    def __init__(self, total_bytes: int = 0, done_bytes: int = 0):
+        self.total_bytes = total_bytes
+        self.done_bytes = done_bytes
+        self.rate = 0.0
+        self.ewma: float | None = None
+        self._lock = threading.Lock()
+        self._window_bytes = 0
+        self._window_start = time.monotonic()
+        self._fixed = done_bytes
+        self._pending_estimate = total_bytes - done_bytes
+        self._finished_estimate = 0
+        self._finished_bytes = 0
+
+    def add(self, nbytes: int):
+        with self._lock:
+            self.done_bytes += nbytes
+            self._window_bytes += nbytes
+            now = time.monotonic()
+            elapsed = now - self._window_start
+            if elapsed >= SAMPLE_INTERVAL:
+                self._sample(elapsed, now)
+
+    def finish_part(self, estimated: int, transferred: int):
+        """Account a finished part, estimated at ``estimated`` bytes, that took ``transferred``."""
+        with self._lock:
+            self._pending_estimate = max(self._pending_estimate - estimated, 0)
+            self._finished_estimate += estimated
+            self._finished_bytes += transferred
+            ratio = (
+                self._finished_bytes / self._finished_estimate if self._finished_estimate else 1.0
+            )
+            self.total_bytes = (
+                self._fixed + self._finished_bytes + int(self._pending_estimate * ratio)
+            )
+
+    def _sample(self, elapsed: float, now: float):
+        self.rate = self._window_bytes / elapsed
+        self.ewma = (
+            self.rate if self.ewma is None
+            else EWMA_ALPHA * self.rate + (1 - EWMA_ALPHA) * self.ewma
+        )
+        self._window_bytes = 0
+        self._window_start = now
+
+    def eta_seconds(self) -> int | None:
+        if not self.ewma or not self.total_bytes:
+            return None
+        return int(max(self.total_bytes - self.done_bytes, 0) / self.ewma)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            # A stall shows up as a falling rate even without new bytes
+            now = time.monotonic()
+            elapsed = now - self._window_start
+            if elapsed >= SAMPLE_INTERVAL * 2:
+                self._sample(elapsed, now)
+            return {
+                "bytes_done": self.done_bytes,
+                # Sizes are partly estimated; never report less than what's done
+                "bytes_total": max(self.total_bytes, self.done_bytes),
+                "rate_bps": int(self.rate),
+                "throughput_bps": int(self.ewma or 0),
+                "eta_seconds": self.eta_seconds(),
+            }
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from mutagen.mp3 import MP3
+from sqlalchemy import delete
+
+from app.config import settings
+from app.database import async_session_maker
+from app.models import ChapterFile
+from app.services.progress_tracker import progress_tracker
+from app.services.tagging import BookTag
+
+# FFmpeg work runs here so it never blocks the event loop or the download threads
+transcode_pool = ThreadPoolExecutor(
+    max_workers=settings.transcode_workers, thread_name_prefix="transcode"
+)
+
+# Keep references to background assembly tasks until they finish
+_assembly_tasks: set[asyncio.Task] = set()
+
+CONTAINER_FORMATS = {"m4b": "mp4", "mka": "matroska"}
+# Matroska holds the MP3 frames as they are; MP4 players expect AAC
+AUDIO_CODECS = {"mp4": ["-c:a", "aac", "-b:a", f"{settings.assemble_aac_bitrate_kbps}k"]}
+
+
+async def run_ffmpeg(args: list[str], input: bytes | None = None):
+    """Run FFmpeg in the transcode pool, raising CalledProcessError on failure."""
+    loop = asyncio.get_event_loop()
+    await loop.run_in_executor(
+        transcode_pool,
+        lambda: subprocess.run(
+            ["ffmpeg", "-loglevel", "error", "-y", *args],
+            input=input,
+            check=True,
+        ),
+    )
+
+
+def _escape_metadata(value: str) -> str:
+    for ch in ("\\", "=", ";", "#", "\n"):
+        value = value.replace(ch, "\\" + ch)
+    return value
+
+
+def _chapter_duration_ms(path: str, fallback: float | None) -> int:
+    try:
+        return int(MP3(path).info.length * 1000)
+    except Exception:
+        return int((fallback or 0) * 1000)
+
+
+def _build_inputs(
+    chapter_files: list[tuple[str, str, float | None]], book_tag: BookTag, workdir: str
+) -> tuple[str, str]:
+    """Write the concat list and FFMETADATA (with chapter markers) files."""
+    list_path = os.path.join(workdir, "chapters.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path, _title, _duration in chapter_files:
+            escaped = path.replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    meta = [";FFMETADATA1", f"title={_escape_metadata(book_tag.album)}"]
+    meta.append(f"album={_escape_metadata(book_tag.album)}")
+    meta.append("genre=Audiobook")
+    if book_tag.author:
+        meta.append(f"artist={_escape_metadata(book_tag.author)}")
+    if book_tag.narrator:
+        meta.append(f"composer={_escape_metadata(book_tag.narrator)}")
+    if book_tag.year:
+        meta.append(f"date={_escape_metadata(book_tag.year)}")
+
+    start = 0
+    for path, title, duration in chapter_files:
+        end = start + _chapter_duration_ms(path, duration)
+        meta += [
+            "[CHAPTER]",
+            "TIMEBASE=1/1000",
+            f"START={start}",
+            f"END={end}",
+            f"title={_escape_metadata(title)}",
+        ]
+        start = end
+
+    meta_path = os.path.join(workdir, "metadata.txt")
+    with open(meta_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(meta) + "\n")
+    return list_path, meta_path
+
+
+async def assemble_book(
+    book_dir: str,
+    chapters: list[dict],
+    book_tag: BookTag,
+    output_format: str,
+) -> str:
+    """Concatenate chapter MP3s into a single container.
+
+    mka keeps the MP3 audio as is; m4b is encoded to AAC. The output is
+    written next to the chapters as ``<album>.<format>`` via a temporary
+    file and an atomic rename. Removed chapters lose their verification
+    records too.
+    """
+    muxer = CONTAINER_FORMATS.get(output_format)
+    if not muxer:
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+    chapter_files = [
+        (os.path.join(book_dir, f"{c['title']}.mp3"), c["title"], c.get("duration"))
+        for c in chapters
+    ]
+    output_path = os.path.join(book_dir, f"{book_tag.album}.{output_format}")
+    temp_path = output_path + ".part"
+
+    loop = asyncio.get_event_loop()
+    with tempfile.TemporaryDirectory() as workdir:
+        list_path, meta_path = await loop.run_in_executor(
+            transcode_pool, _build_inputs, chapter_files, book_tag, workdir
+        )
+
+        args = [
+            "-f", "concat", "-safe", "0", "-i", list_path,
+            "-i", meta_path,
+        ]
+        cover = book_tag.cover_data if muxer == "mp4" else None
+        if cover:
+            args += ["-f", "image2pipe", "-i", "pipe:0"]
+        args += ["-map", "0:a", "-map_metadata", "1", "-map_chapters", "1"]
+        if cover:
+            args += ["-map", "2:v", "-c:v", "copy", "-disposition:v", "attached_pic"]
+        args += AUDIO_CODECS.get(muxer, ["-c:a", "copy"])
+        if muxer == "mp4":
+            args += ["-movflags", "+faststart"]
+        args += ["-f", muxer, temp_path]
+
+        try:
+            await run_ffmpeg(args, input=cover)
+            os.replace(temp_path, output_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    if not settings.assemble_keep_chapters:
+        for path, _title, _duration in chapter_files:
+            if os.path.exists(path):
+                os.remove(path)
+        async with async_session_maker() as db:
+            await db.execute(
+                delete(ChapterFile).where(
+                    ChapterFile.path.in_([os.path.normpath(p) for p, _, _ in chapter_files])
+                )
+            )
+            await db.commit()
+
+    return output_path
+
+
+async def _assemble_in_background(
+    queue_id: int, book_dir: str, chapters: list[dict], book_tag: BookTag
+):
+    fmt = settings.assemble_format
+    try:
+        output_path = await assemble_book(book_dir, chapters, book_tag, fmt)
+    except Exception as e:
+        print(f"Assembly failed for queue item {queue_id}: {e}")
+        await progress_tracker.queue_update(
+            queue_id, "completed", message=f"{fmt} assembly failed: {e}"
+        )
+        return
+    await progress_tracker.queue_update(
+        queue_id, "completed", message=f"Assembled {os.path.basename(output_path)}"
+    )
+
+
+def schedule_assembly(
+    queue_id: int, book_dir: str, chapters: list[dict], book_tag: BookTag
+):
+    """Assemble a finished book in the background if ``assemble_format`` is set."""
+    if not settings.assemble_format:
+        return
+    task = asyncio.create_task(
+        _assemble_in_background(queue_id, book_dir, chapters, book_tag)
+    )
+    _assembly_tasks.add(task)
+    task.add_done_callback(_assembly_tasks.discard)
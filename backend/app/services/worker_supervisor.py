@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, update
+
+from app.config import settings
+from app.database import async_session_maker
+from app.models import QueueItem
+from app.services.cancellation import cancellation_registry
+from app.services.download_worker import process_queue
+from app.services.prefetch import metadata_prefetcher
+
+
+async def recover_orphans() -> int:
+    """Requeue items left fetching/downloading by a worker whose lease expired.
+
+    This picks up downloads interrupted by a crash or restart; chapters that
+    were already verified on disk are skipped when they run again.
+    """
+    stale = datetime.utcnow() - timedelta(seconds=settings.lease_timeout)
+    async with async_session_maker() as db:
+        result = await db.execute(
+            update(QueueItem)
+            .where(
+                QueueItem.status.in_(("fetching", "downloading")),
+                or_(QueueItem.heartbeat_at.is_(None), QueueItem.heartbeat_at < stale),
+            )
+            .values(
+                status="pending",
+                worker_id=None,
+                heartbeat_at=None,
+                error_message="Interrupted, resuming",
+            )
+        )
+        await db.commit()
+    if result.rowcount:
+        print(f"Requeued {result.rowcount} interrupted download(s)")
+    return result.rowcount
+
+
+class WorkerSupervisor:
+    """Background loop that keeps the queue moving.
+
+    Runs the worker whenever it is woken (new or retried items) and at least
+    every ``supervisor_poll_interval`` seconds, requeueing orphaned items
+    before each pass.
+    """
+
+    def __init__(self):
+        self._wake: asyncio.Event | None = None
+        self._stop: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self._wake = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def wake(self):
+        if self._wake:
+            self._wake.set()
+            # New items get their titles and chapter counts right away
+            metadata_prefetcher.schedule()
+
+    async def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                await recover_orphans()
+                await process_queue(self._stop)
+            except Exception as e:
+                print(f"Worker supervisor error: {e}")
+            try:
+                await asyncio.wait_for(
+                    self._wake.wait(), timeout=settings.supervisor_poll_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop taking new items and interrupt running ones, releasing their leases."""
+        if not self._task:
+            return
+        self._stop.set()
+        self._wake.set()
+        cancellation_registry.cancel_all("shutdown")
+        try:
+            await asyncio.wait_for(self._task, timeout=timeout)
+        except asyncio.TimeoutError:
+            # Leases of anything still running expire and are recovered on start
+            pass
+        self._task = None
+
+
+# Global singleton
+worker_supervisor = WorkerSupervisor()
@@ -0,0 +1,125 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+
+from app.config import settings
+from app.database import async_session_maker
+from app.models import BandwidthSettings, WorkerStatus
+from app.services.adaptive_concurrency import segment_limiter
+from app.services.bandwidth import bandwidth_scheduler
+from app.services.heartbeat import WORKER_ID
+
+BANDWIDTH_KEYS = ("global_limit_kib", "site_limits_kib", "full_speed_windows")
+
+
+def _bandwidth_config() -> dict:
+    snapshot = bandwidth_scheduler.snapshot()
+    return {key: snapshot[key] for key in BANDWIDTH_KEYS}
+
+
+async def save_bandwidth_config():
+    """Store the scheduler's current limits, for restarts and separate workers."""
+    stmt = insert(BandwidthSettings).values(
+        id=1, data=json.dumps(_bandwidth_config()), updated_at=datetime.utcnow()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BandwidthSettings.id],
+        set_={"data": stmt.excluded.data, "updated_at": stmt.excluded.updated_at},
+    )
+    async with async_session_maker() as db:
+        await db.execute(stmt)
+        await db.commit()
+
+
+async def load_bandwidth_config() -> bool:
+    """Apply stored limits to this process's scheduler; returns whether anything changed."""
+    async with async_session_maker() as db:
+        data = await db.scalar(select(BandwidthSettings.data).where(BandwidthSettings.id == 1))
+    if data is None:
+        return False
+    config = json.loads(data)
+    if config == _bandwidth_config():
+        return False
+    bandwidth_scheduler.configure(*(config[key] for key in BANDWIDTH_KEYS))
+    return True
+
+
+async def worker_metrics() -> dict[str, dict]:
+    """Metrics of other worker processes that reported recently, by worker id."""
+    fresh = datetime.utcnow() - timedelta(seconds=settings.lease_timeout)
+    async with async_session_maker() as db:
+        result = await db.execute(
+            select(WorkerStatus.worker_id, WorkerStatus.data).where(
+                WorkerStatus.updated_at >= fresh,
+                # The API process running the embedded worker reports itself directly
+                WorkerStatus.worker_id != WORKER_ID,
+            )
+        )
+        return {worker_id: json.loads(data) for worker_id, data in result.all()}
+
+
+class WorkerSync:
+    """Keeps a worker process in step with the API processes.
+
+    Runs in a separate worker (``python -m app.worker``) and in the API
+    process running the embedded worker. Every ``worker_sync_interval``
+    seconds it reloads bandwidth limits changed through the API and
+    publishes this worker's scheduler and segment limiter snapshots, which
+    the API includes in its metrics.
+    """
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        async with async_session_maker() as db:
+            await db.execute(delete(WorkerStatus).where(WorkerStatus.worker_id == WORKER_ID))
+            await db.commit()
+
+    async def _run(self):
+        while True:
+            try:
+                if await load_bandwidth_config():
+                    print("Bandwidth limits updated")
+                await self.publish()
+            except Exception as e:
+                print(f"Worker sync failed: {e}")
+            await asyncio.sleep(settings.worker_sync_interval)
+
+    async def publish(self):
+        now = datetime.utcnow()
+        data = json.dumps({
+            "segment_concurrency": segment_limiter.snapshot(),
+            "bandwidth": bandwidth_scheduler.snapshot(),
+        })
+        stmt = insert(WorkerStatus).values(worker_id=WORKER_ID, data=data, updated_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[WorkerStatus.worker_id],
+            set_={"data": stmt.excluded.data, "updated_at": stmt.excluded.updated_at},
+        )
+        async with async_session_maker() as db:
+            await db.execute(stmt)
+            # Workers that died without cleaning up
+            await db.execute(
+                delete(WorkerStatus).where(
+                    WorkerStatus.updated_at < now - timedelta(seconds=settings.lease_timeout)
+                )
+            )
+            await db.commit()
+
+
+# Global singleton
+worker_sync = WorkerSync()
@@ -0,0 +1,56 @@
+"""Standalone download worker: ``python -m app.worker``.
+
+Runs the queue outside the API process. Items are claimed atomically and
+held through heartbeat-renewed leases, so several workers (and the API
+with ``run_embedded_worker``) can run side by side; an item whose worker
+dies is requeued once its lease expires. Set ``RUN_EMBEDDED_WORKER=false``
+on the API and ``EVENT_BACKEND=sqlite`` on both so progress reaches the
+API's live status stream. Bandwidth limits set through the API reach the
+worker through the database, and the worker's metrics show up in
+``/api/status/metrics``.
+"""
+import asyncio
+import signal
+
+from app.config import settings
+from app.database import init_db
+from app.services.event_bus import create_event_backend
+from app.services.heartbeat import WORKER_ID
+from app.services.library import library_scanner
+from app.services.progress_tracker import progress_tracker
+from app.services.worker_supervisor import worker_supervisor
+from app.services.worker_sync import load_bandwidth_config, worker_sync
+
+
+async def run():
+    await init_db()
+    if settings.event_backend != "sqlite":
+        print("Warning: event_backend is not 'sqlite'; API clients won't see this worker's progress")
+    await progress_tracker.start(create_event_backend())
+    await load_bandwidth_config()
+    # Follows bandwidth changes made through the API, reports metrics back
+    worker_sync.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    print(f"Download worker {WORKER_ID} started")
+    worker_supervisor.start()
+    await stop.wait()
+
+    print("Stopping download worker...")
+    await worker_supervisor.stop()
+    # Book rescans scheduled by finished downloads
+    await library_scanner.stop()
+    await worker_sync.stop()
+    await progress_tracker.stop()
+
+
+def main():
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,20 @@
 import requests
+import threading
 import time
 from urllib.parse import urlparse, quote
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# requests.Session isn't thread-safe: each segment thread keeps its own,
+# which also reuses its connection from one segment to the next
+_segment_sessions = threading.local()
+
+
+def _segment_session():
+    session = getattr(_segment_sessions, "session", None)
+    if session is None:
+        session = _segment_sessions.session = requests.Session()
+    return session
 
 
 class TokybookScraper:
@@ -9,33 +22,17 @@ class TokybookScraper:
     AUDIO_API_PATH = "/api/v1/public/audio"
     FULL_AUDIO_BASE = f"{BASE_URL}{AUDIO_API_PATH}"
     USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36"
+    SEGMENT_MAX_ATTEMPTS = 5
 
     def fetch_book_data(self, url):
         """
         Scrapes metadata and prepares the chapter list with tokens.
         """
-        slug = self._get_slug(url)
-        session = requests.Session()
-        session.headers.update({"user-agent": self.USER_AGENT, "origin": self.BASE_URL})
+        session = self._session()
 
         # 1. Get Post Details (Metadata + ID)
-        print(f"[*] Fetching metadata for: {slug}...")
-        details_url = f"{self.BASE_URL}/api/v1/search/post-details"
-        payload = {
-            "dynamicSlugId": slug,
-            "userIdentity": {
-                "ipAddress": "127.0.0.1",
-                "userAgent": self.USER_AGENT,
-                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
-            },
-        }
-
-        try:
-            r = session.post(details_url, json=payload)
-            r.raise_for_status()
-            data = r.json()
-        except Exception as e:
-            print(f"[!] Error fetching details: {e}")
+        data = self._fetch_post_details(session, self._get_slug(url))
+        if data is None:
             return None
 
         title = data.get("title")
@@ -43,20 +40,8 @@ class TokybookScraper:
         post_detail_token = data.get("postDetailToken")
 
         # 2. Get Playlist (Tracks + Stream Token)
-        print(f"[*] Fetching playlist for ID: {audio_book_id}...")
-        playlist_url = f"{self.BASE_URL}/api/v1/playlist"
-        playlist_payload = {
-            "audioBookId": audio_book_id,
-            "postDetailToken": post_detail_token,
-            "userIdentity": payload["userIdentity"],
-        }
-
-        try:
-            r = session.post(playlist_url, json=playlist_payload)
-            r.raise_for_status()
-            playlist_data = r.json()
-        except Exception as e:
-            print(f"[!] Error fetching playlist: {e}")
+        playlist_data = self._fetch_playlist(session, audio_book_id, post_detail_token)
+        if playlist_data is None:
             return None
 
         stream_token = playlist_data.get("streamToken")
@@ -90,10 +75,81 @@ class TokybookScraper:
             "cover_url": data.get("coverImage") if data.get("coverImage") else None,
             "chapters": chapters,
             "audio_book_id": audio_book_id,
+            "post_detail_token": post_detail_token,
             "stream_token": stream_token,
             "site_headers": {"user-agent": self.USER_AGENT},
         }
 
+    def refresh_book_data(self, url, book_data):
+        """
+        Renews the stream token of previously fetched book data, keeping its chapter list.
+
+        The stream token only comes with the playlist, so that is asked for
+        with the stored post-detail token; the post itself is looked up again
+        only when that token is missing (older manifests) or refused.
+        """
+        session = self._session()
+        audio_book_id = book_data.get("audio_book_id")
+        post_detail_token = book_data.get("post_detail_token")
+        playlist_data = None
+        if audio_book_id and post_detail_token:
+            playlist_data = self._fetch_playlist(session, audio_book_id, post_detail_token)
+
+        if not playlist_data or not playlist_data.get("streamToken"):
+            data = self._fetch_post_details(session, self._get_slug(url))
+            if data is None:
+                return None
+            audio_book_id = data.get("audioBookId")
+            post_detail_token = data.get("postDetailToken")
+            playlist_data = self._fetch_playlist(session, audio_book_id, post_detail_token)
+            if not playlist_data or not playlist_data.get("streamToken"):
+                return None
+
+        return {
+            **book_data,
+            "audio_book_id": audio_book_id,
+            "post_detail_token": post_detail_token,
+            "stream_token": playlist_data["streamToken"],
+        }
+
+    def _session(self):
+        session = requests.Session()
+        session.headers.update({"user-agent": self.USER_AGENT, "origin": self.BASE_URL})
+        return session
+
+    def _user_identity(self):
+        return {
+            "ipAddress": "127.0.0.1",
+            "userAgent": self.USER_AGENT,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+        }
+
+    def _fetch_post_details(self, session, slug):
+        print(f"[*] Fetching metadata for: {slug}...")
+        payload = {"dynamicSlugId": slug, "userIdentity": self._user_identity()}
+        try:
+            r = session.post(f"{self.BASE_URL}/api/v1/search/post-details", json=payload)
+            r.raise_for_status()
+            return r.json()
+        except Exception as e:
+            print(f"[!] Error fetching details: {e}")
+            return None
+
+    def _fetch_playlist(self, session, audio_book_id, post_detail_token):
+        print(f"[*] Fetching playlist for ID: {audio_book_id}...")
+        payload = {
+            "audioBookId": audio_book_id,
+            "postDetailToken": post_detail_token,
+            "userIdentity": self._user_identity(),
+        }
+        try:
+            r = session.post(f"{self.BASE_URL}/api/v1/playlist", json=payload)
+            r.raise_for_status()
+            return r.json()
+        except Exception as e:
+            print(f"[!] Error fetching playlist: {e}")
+            return None
+
     def _get_slug(self, url):
         return urlparse(url).path.strip("/").split("/")[-1]
 
@@ -108,22 +164,75 @@ class TokybookScraper:
         }
 
     @staticmethod
-    def _fetch_segment(args):
+    def _fetch_segment(
+        ts_url, audio_id, stream_token, limiter=None, throttle=None, cancel_event=None
+    ):
         """Worker for ThreadPool"""
-        ts_url, audio_id, stream_token = args
         headers = TokybookScraper._get_dynamic_headers(ts_url, audio_id, stream_token)
-        try:
-            r = requests.get(ts_url, headers=headers, timeout=10)
-            if r.status_code == 200:
-                return r.content
-        except Exception:
-            pass
+
+        if cancel_event and cancel_event.is_set():
+            return None
+
+        if limiter is None:
+            try:
+                r = _segment_session().get(ts_url, headers=headers, timeout=10)
+            except Exception:
+                return None
+            if r.status_code != 200:
+                return None
+            if throttle:
+                throttle(len(r.content))
+            return r.content
+
+        for attempt in range(TokybookScraper.SEGMENT_MAX_ATTEMPTS):
+            content = None
+            with limiter.slot() as done:
+                try:
+                    r = _segment_session().get(ts_url, headers=headers, timeout=10)
+                except Exception:
+                    done(ok=False)
+                else:
+                    # Tokybook signals rate limiting with 429s or empty bodies;
+                    # an HTML body means we got an error page, not a segment
+                    if r.status_code == 200 and r.content and r.content[:1] != b"<":
+                        done(nbytes=len(r.content))
+                        content = r.content
+                    else:
+                        done(ok=False, throttled=r.status_code in (200, 429, 503))
+            if content is not None:
+                # Outside the slot: waiting on the bandwidth cap isn't server
+                # latency, and shouldn't keep another segment from starting
+                if throttle:
+                    throttle(len(content))
+                return content
+            backoff = min(2 ** attempt * 0.5, 8)
+            if cancel_event:
+                if cancel_event.wait(backoff):
+                    return None
+            else:
+                time.sleep(backoff)
         return None
 
     @staticmethod
-    def download_chapter(chapter_data, book_data, output_path, progress_callback=None):
+    def download_chapter(
+        chapter_data,
+        book_data,
+        output_path,
+        progress_callback=None,
+        limiter=None,
+        throttle=None,
+        verifier=None,
+        cancel_event=None,
+    ):
         """
         Specialized downloader for Tokybook that handles m3u8 and parallel segments.
+
+        When a ``limiter`` (see ``app.services.adaptive_concurrency``) is given,
+        segment fetches adapt their concurrency to it instead of using a fixed pool.
+        ``throttle(nbytes)`` is called after each segment and may block to
+        enforce bandwidth limits. Every written chunk is also passed to
+        ``verifier.update`` if one is given. Setting ``cancel_event`` stops
+        pending segment fetches and makes the download fail.
         """
         audio_id = book_data.get("audio_book_id")
         stream_token = book_data.get("stream_token")
@@ -149,7 +258,15 @@ class TokybookScraper:
                 ts_url = ts_file
             else:
                 ts_url = f"{base_segment_url}/{ts_file}"
-            tasks.append((ts_url, audio_id, stream_token))
+            tasks.append(ts_url)
+        fetch_segment = partial(
+            TokybookScraper._fetch_segment,
+            audio_id=audio_id,
+            stream_token=stream_token,
+            limiter=limiter,
+            throttle=throttle,
+            cancel_event=cancel_event,
+        )
 
         # 3. Download
         if progress_callback:
@@ -157,12 +274,15 @@ class TokybookScraper:
 
         downloaded_buffer = []
 
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            results = executor.map(TokybookScraper._fetch_segment, tasks)
+        max_workers = limiter.max_limit if limiter else 10
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(fetch_segment, tasks)
 
             for chunk in results:
                 if chunk:
                     downloaded_buffer.append(chunk)
+                elif cancel_event and cancel_event.is_set():
+                    raise Exception("Download cancelled")
                 else:
                     raise Exception("Segment download failed")
 
@@ -170,3 +290,5 @@ class TokybookScraper:
         with open(output_path, "wb") as f:
             for chunk in downloaded_buffer:
                 f.write(chunk)
+                if verifier:
+                    verifier.update(chunk)
@@ -0,0 +1,24 @@
+import threading
+import time
+
+import pytest
+
+from app.services.bandwidth import BandwidthScheduler, _parse_window
+
+
+def test_parse_window_rejects_hours_outside_the_day():
+    assert _parse_window("22:00-06:30") == (22 * 60, 6 * 60 + 30)
+    with pytest.raises(ValueError):
+        _parse_window("22:00-24:00")
+
+
+def test_cancel_cuts_a_throttled_wait_short():
+    scheduler = BandwidthScheduler(global_limit_kib=1)
+    scheduler.register(1, "example.com")
+    cancel_event = threading.Event()
+    threading.Timer(0.1, cancel_event.set).start()
+
+    started = time.monotonic()
+    # Ten seconds' worth of tokens at 1 KiB/s
+    scheduler.consume(1, 11 * 1024, cancel_event=cancel_event)
+    assert time.monotonic() - started < 2
@@ -0,0 +1,12 @@
+from app.services.dedup import same_book
+
+
+def test_same_book_needs_matching_authors_when_both_are_known():
+    assert same_book("Jane Doe", "jane doe", 10, 12)
+    assert not same_book("Jane Doe", "John Roe", 10, 10)
+
+
+def test_same_book_without_an_author_needs_equal_chapter_counts():
+    assert same_book(None, "Jane Doe", 10, 10)
+    assert not same_book(None, None, 10, 12)
+    assert not same_book(None, None, 0, 0)
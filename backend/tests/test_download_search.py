@@ -0,0 +1,22 @@
+import asyncio
+
+from app.services import download_search
+
+
+class FakeSession:
+    """Answers ``max(id)`` and every count with fixed numbers."""
+
+    async def scalar(self, query):
+        return 7
+
+
+def test_count_cache_keeps_only_recent_searches(monkeypatch):
+    monkeypatch.setattr(download_search, "COUNT_CACHE_SIZE", 3)
+    download_search.invalidate_counts()
+
+    async def run():
+        for word in ("a", "b", "c", "a", "d"):
+            await download_search.count_downloads(FakeSession(), download_search.fts_query(word))
+
+    asyncio.run(run())
+    assert list(download_search._count_cache) == ['"c"*', '"a"*', '"d"*']
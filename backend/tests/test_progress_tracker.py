@@ -0,0 +1,71 @@
+import asyncio
+
+from app.services.progress_tracker import ProgressTracker
+
+
+async def _drain(subscriber) -> list[dict]:
+    events = []
+    while event := await subscriber.get(timeout=0):
+        events.append(event)
+    return events
+
+
+def test_coalesced_event_moves_behind_newer_events():
+    async def run():
+        tracker = ProgressTracker(buffer_size=10)
+        subscriber = await tracker.subscribe()
+        await _drain(subscriber)
+
+        await tracker.download_progress(1, current_chapter=1, total_chapters=3)
+        await tracker.download_complete(2, "Book 2")
+        await tracker.download_progress(1, current_chapter=2, total_chapters=3)
+        return await _drain(subscriber)
+
+    events = asyncio.run(run())
+    assert [e["type"] for e in events] == ["download_complete", "download_progress"]
+    assert [e["id"] for e in events] == [2, 3]
+
+
+def test_reconnect_after_coalescing_receives_terminal_event():
+    async def run():
+        tracker = ProgressTracker(buffer_size=10)
+        subscriber = await tracker.subscribe()
+        await _drain(subscriber)
+
+        await tracker.download_progress(1, current_chapter=1, total_chapters=3)
+        await tracker.download_complete(2, "Book 2")
+        await tracker.download_progress(1, current_chapter=2, total_chapters=3)
+        await tracker.download_error(1, "boom")
+
+        # The connection drops after one event; the client resumes from its id
+        received = [await subscriber.get(timeout=0)]
+        tracker.unsubscribe(subscriber)
+        resumed = await tracker.subscribe(last_event_id=received[-1]["id"])
+        return received + await _drain(resumed)
+
+    events = asyncio.run(run())
+    ids = [e["id"] for e in events]
+    assert ids == sorted(set(ids))
+    types = [e["type"] for e in events]
+    assert "download_complete" in types
+    assert types[-1] == "download_error"
+
+
+def test_replay_delivers_missed_events_in_id_order():
+    async def run():
+        tracker = ProgressTracker(buffer_size=10)
+        await tracker.download_progress(1, current_chapter=1, total_chapters=3)
+        await tracker.download_progress(2, current_chapter=1, total_chapters=3)
+        await tracker.download_progress(1, current_chapter=2, total_chapters=3)
+        await tracker.download_complete(2, "Book 2")
+        await tracker.download_progress(1, current_chapter=3, total_chapters=3)
+
+        subscriber = await tracker.subscribe(last_event_id=1)
+        return await _drain(subscriber)
+
+    events = asyncio.run(run())
+    # Item 1's progress coalesces to its latest event, behind the completion
+    assert [e["id"] for e in events] == [2, 4, 5]
+    assert [e["type"] for e in events] == [
+        "download_progress", "download_complete", "download_progress"
+    ]
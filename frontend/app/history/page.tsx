@@ -3,8 +3,9 @@
 import { useState, useEffect } from "react";
 import { useRouter } from "next/navigation";
 import Navbar from "@/components/Navbar";
+import ChapterPlayer from "@/components/ChapterPlayer";
 import { getDownloads, deleteDownload, isAuthenticated } from "@/lib/api";
-import { Loader2, Trash2, Search, ChevronLeft, ChevronRight } from "lucide-react";
+import { Loader2, Trash2, Search, ChevronLeft, ChevronRight, Play, X } from "lucide-react";
 
 interface Download {
   id: number;
@@ -23,6 +24,9 @@ export default function HistoryPage() {
   const [searchQuery, setSearchQuery] = useState("");
   const [page, setPage] = useState(1);
   const [total, setTotal] = useState(0);
+  // cursors[n] fetches page n + 1; the API pages by cursor so deep pages stay fast
+  const [cursors, setCursors] = useState<(string | undefined)[]>([undefined]);
+  const [playingId, setPlayingId] = useState<number | null>(null);
   const limit = 20;
 
   useEffect(() => {
@@ -37,9 +41,14 @@ export default function HistoryPage() {
   const fetchDownloads = async () => {
     setLoading(true);
     try {
-      const data = await getDownloads(page, limit, searchQuery || undefined);
+      const data = await getDownloads(page, limit, searchQuery || undefined, cursors[page - 1]);
       setDownloads(data.items || []);
       setTotal(data.total || 0);
+      setCursors((prev) => {
+        const next = prev.slice(0, page);
+        next[page] = data.next_cursor || undefined;
+        return next;
+      });
     } catch (error) {
       console.error("Failed to fetch downloads:", error);
     } finally {
@@ -77,6 +86,7 @@ export default function HistoryPage() {
             onChange={(e) => {
               setSearchQuery(e.target.value);
               setPage(1);
+              setCursors([undefined]);
             }}
             placeholder="Search downloads..."
             className="w-full px-4 py-2 pl-10 bg-zinc-900 border border-zinc-700 rounded-lg text-zinc-100 placeholder-zinc-500 focus:outline-none focus:border-zinc-500"
@@ -98,28 +108,42 @@ export default function HistoryPage() {
               {downloads.map((download) => (
                 <div
                   key={download.id}
-                  className="flex items-center justify-between p-4 bg-zinc-900 border border-zinc-800 rounded-lg"
+                  className="p-4 bg-zinc-900 border border-zinc-800 rounded-lg"
                 >
-                  <div className="flex-1 min-w-0">
-                    <h3 className="font-medium text-zinc-100 truncate">
-                      {download.title}
-                    </h3>
-                    <p className="text-sm text-zinc-400">
-                      {download.author || "Unknown Author"}
-                      {download.narrator && ` - Narrated by ${download.narrator}`}
-                    </p>
-                    <p className="text-xs text-zinc-500 mt-1">
-                      {download.chapters_total} chapters - {download.site} -{" "}
-                      {new Date(download.completed_at).toLocaleDateString()}
-                    </p>
+                  <div className="flex items-center justify-between">
+                    <div className="flex-1 min-w-0">
+                      <h3 className="font-medium text-zinc-100 truncate">
+                        {download.title}
+                      </h3>
+                      <p className="text-sm text-zinc-400">
+                        {download.author || "Unknown Author"}
+                        {download.narrator && ` - Narrated by ${download.narrator}`}
+                      </p>
+                      <p className="text-xs text-zinc-500 mt-1">
+                        {download.chapters_total} chapters - {download.site} -{" "}
+                        {new Date(download.completed_at).toLocaleDateString()}
+                      </p>
+                    </div>
+                    <button
+                      onClick={() => setPlayingId(playingId === download.id ? null : download.id)}
+                      className="p-2 text-zinc-500 hover:text-emerald-400 transition-colors"
+                      title={playingId === download.id ? "Close player" : "Play"}
+                    >
+                      {playingId === download.id ? <X size={16} /> : <Play size={16} />}
+                    </button>
+                    <button
+                      onClick={() => handleDelete(download.id)}
+                      className="p-2 text-zinc-500 hover:text-red-400 transition-colors"
+                      title="Remove from history"
+                    >
+                      <Trash2 size={16} />
+                    </button>
                   </div>
-                  <button
-                    onClick={() => handleDelete(download.id)}
-                    className="p-2 text-zinc-500 hover:text-red-400 transition-colors"
-                    title="Remove from history"
-                  >
-                    <Trash2 size={16} />
-                  </button>
+                  {playingId === download.id && (
+                    <div className="mt-4">
+                      <ChapterPlayer downloadId={download.id} />
+                    </div>
+                  )}
                 </div>
               ))}
             </div>
@@ -140,7 +164,7 @@ export default function HistoryPage() {
                 </span>
                 <button
                   onClick={() => setPage((p) => Math.min(totalPages, p + 1))}
-                  disabled={page === totalPages}
+                  disabled={page === totalPages || !cursors[page]}
                   className="flex items-center gap-1 px-3 py-2 text-sm text-zinc-400 hover:text-zinc-100 disabled:opacity-50 disabled:cursor-not-allowed transition-colors"
                 >
                   Next
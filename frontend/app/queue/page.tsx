@@ -1,12 +1,12 @@
 "use client";
 
-import { useState, useEffect, useCallback } from "react";
+import { useState, useEffect, useCallback, useRef } from "react";
 import { useRouter } from "next/navigation";
 import Navbar from "@/components/Navbar";
 import QueueItem from "@/components/QueueItem";
-import { getQueue, removeFromQueue, retryDownload, isAuthenticated } from "@/lib/api";
+import { getQueue, importQueueFile, removeFromQueue, retryDownload, isAuthenticated } from "@/lib/api";
 import { createSSEConnection, SSEEvent } from "@/lib/sse";
-import { Loader2, RefreshCw } from "lucide-react";
+import { Loader2, RefreshCw, Upload } from "lucide-react";
 
 interface QueueItemData {
   id: number;
@@ -19,17 +19,40 @@ interface QueueItemData {
   total_chapters: number;
   error_message?: string;
   eta_seconds?: number;
+  bytes_done?: number;
+  bytes_total?: number;
+  rate_bps?: number;
 }
 
+const ACTIVE_STATUSES = "pending,fetching,downloading";
+const FINISHED_STATUSES = "completed,failed,cancelled";
+// Finished items shown; older ones stay in the history
+const FINISHED_LIMIT = 50;
+// Polls between full reloads, which also pick up items removed elsewhere
+const FULL_RELOAD_EVERY = 12;
+
 export default function QueuePage() {
   const router = useRouter();
   const [items, setItems] = useState<QueueItemData[]>([]);
   const [loading, setLoading] = useState(true);
+  const since = useRef<string | null>(null);
+  const polls = useRef(0);
 
   const fetchQueue = useCallback(async () => {
     try {
-      const data = await getQueue();
-      setItems(data.items || []);
+      const active: QueueItemData[] = [];
+      let cursor: string | undefined;
+      let nextSince: string | null = null;
+      do {
+        const data = await getQueue({ status: ACTIVE_STATUSES, limit: 500, cursor });
+        active.push(...(data.items || []));
+        nextSince = nextSince ?? data.next_since;
+        cursor = data.next_cursor || undefined;
+      } while (cursor);
+      const finished = await getQueue({ status: FINISHED_STATUSES, limit: FINISHED_LIMIT });
+      setItems([...active, ...(finished.items || [])]);
+      since.current = nextSince;
+      polls.current = 0;
     } catch (error) {
       console.error("Failed to fetch queue:", error);
     } finally {
@@ -37,6 +60,28 @@ export default function QueuePage() {
     }
   }, []);
 
+  // Fetch only the items changed since the last response
+  const pollQueue = useCallback(async () => {
+    polls.current += 1;
+    if (!since.current || polls.current >= FULL_RELOAD_EVERY) {
+      return fetchQueue();
+    }
+    try {
+      const data = await getQueue({ since: since.current });
+      const changed: QueueItemData[] = data.items || [];
+      since.current = data.next_since || since.current;
+      if (changed.length === 0) return;
+      const byId = new Map(changed.map((item) => [item.id, item]));
+      setItems((prev) => {
+        const known = new Set(prev.map((item) => item.id));
+        const added = changed.filter((item) => !known.has(item.id));
+        return [...added.reverse(), ...prev.map((item) => ({ ...item, ...byId.get(item.id) }))];
+      });
+    } catch (error) {
+      console.error("Failed to poll queue:", error);
+    }
+  }, [fetchQueue]);
+
   useEffect(() => {
     if (!isAuthenticated()) {
       router.push("/login");
@@ -47,7 +92,16 @@ export default function QueuePage() {
 
     // Set up SSE for real-time updates
     const cleanup = createSSEConnection((event: SSEEvent) => {
-      if (event.type === "queue_update" || event.type === "download_progress") {
+      if (event.type === "snapshot") {
+        const snapshot = (event.data.items || []) as (Partial<QueueItemData> & { queue_id: number })[];
+        const states = new Map(snapshot.map((s) => [s.queue_id, s]));
+        setItems((prev) =>
+          prev.map((item) => {
+            const state = states.get(item.id);
+            return state ? { ...item, ...state, id: item.id } : item;
+          })
+        );
+      } else if (event.type === "queue_update" || event.type === "download_progress") {
         const data = event.data;
         setItems((prev) =>
           prev.map((item) =>
@@ -59,6 +113,9 @@ export default function QueuePage() {
                   total_chapters: (data.total_chapters as number) ?? item.total_chapters,
                   title: (data.title as string) || item.title,
                   eta_seconds: (data.eta_seconds as number) ?? item.eta_seconds,
+                  bytes_done: (data.bytes_done as number) ?? item.bytes_done,
+                  bytes_total: (data.bytes_total as number) ?? item.bytes_total,
+                  rate_bps: (data.rate_bps as number) ?? item.rate_bps,
                 }
               : item
           )
@@ -78,13 +135,13 @@ export default function QueuePage() {
     });
 
     // Poll every 5 seconds as backup
-    const interval = setInterval(fetchQueue, 5000);
+    const interval = setInterval(pollQueue, 5000);
 
     return () => {
       cleanup();
       clearInterval(interval);
     };
-  }, [router, fetchQueue]);
+  }, [router, fetchQueue, pollQueue]);
 
   const handleRemove = async (id: number) => {
     try {
@@ -95,6 +152,25 @@ export default function QueuePage() {
     }
   };
 
+  const handleImport = async (e: React.ChangeEvent<HTMLInputElement>) => {
+    const file = e.target.files?.[0];
+    e.target.value = "";
+    if (!file) return;
+    try {
+      const data = await importQueueFile(file);
+      const skipped = [...(data.duplicates || []), ...(data.rejected || [])];
+      if (skipped.length > 0) {
+        alert(
+          `Added ${data.items.length} books. Skipped ${skipped.length}:\n` +
+            skipped.map((s: { url: string; reason: string }) => `${s.url}: ${s.reason}`).join("\n")
+        );
+      }
+      fetchQueue();
+    } catch (error) {
+      console.error("Failed to import:", error);
+    }
+  };
+
   const handleRetry = async (id: number) => {
     try {
       await retryDownload(id);
@@ -118,13 +194,20 @@ export default function QueuePage() {
       <main className="max-w-4xl mx-auto px-4 py-8">
         <div className="flex items-center justify-between mb-6">
           <h1 className="text-2xl font-bold text-zinc-100">Download Queue</h1>
-          <button
-            onClick={fetchQueue}
-            className="flex items-center gap-2 px-3 py-2 text-sm text-zinc-400 hover:text-zinc-100 transition-colors"
-          >
-            <RefreshCw size={16} />
-            Refresh
-          </button>
+          <div className="flex items-center gap-2">
+            <label className="flex items-center gap-2 px-3 py-2 text-sm text-zinc-400 hover:text-zinc-100 transition-colors cursor-pointer">
+              <Upload size={16} />
+              Import list
+              <input type="file" accept=".txt,text/plain" onChange={handleImport} className="hidden" />
+            </label>
+            <button
+              onClick={fetchQueue}
+              className="flex items-center gap-2 px-3 py-2 text-sm text-zinc-400 hover:text-zinc-100 transition-colors"
+            >
+              <RefreshCw size={16} />
+              Refresh
+            </button>
+          </div>
         </div>
 
         {loading ? (
@@ -0,0 +1,112 @@
+"use client";
+
+import { useState, useEffect, useRef } from "react";
+import { Loader2 } from "lucide-react";
+import { getLibraryBook, mediaUrl } from "@/lib/api";
+
+interface LibraryFile {
+  name: string;
+  chapter?: number;
+  duration?: number;
+  error?: string;
+  stream_url?: string;
+}
+
+interface ChapterPlayerProps {
+  downloadId: number;
+}
+
+function formatDuration(seconds?: number) {
+  if (!seconds) return "";
+  const m = Math.floor(seconds / 60);
+  const s = Math.round(seconds % 60);
+  return `${m}:${String(s).padStart(2, "0")}`;
+}
+
+export default function ChapterPlayer({ downloadId }: ChapterPlayerProps) {
+  const [files, setFiles] = useState<LibraryFile[]>([]);
+  const [loading, setLoading] = useState(true);
+  const [current, setCurrent] = useState(0);
+  const audioRef = useRef<HTMLAudioElement>(null);
+  // Where to pick up after reloading expired stream URLs
+  const resumeAt = useRef<number | null>(null);
+
+  const loadFiles = async () => {
+    try {
+      const data = await getLibraryBook(downloadId);
+      setFiles(data.files || []);
+    } catch (error) {
+      console.error("Failed to load chapters:", error);
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  useEffect(() => {
+    loadFiles();
+  }, [downloadId]);
+
+  const handleError = () => {
+    // Most likely the signed URL expired; fetch fresh ones once
+    if (resumeAt.current !== null) return;
+    resumeAt.current = audioRef.current?.currentTime || 0;
+    loadFiles();
+  };
+
+  const handleLoaded = () => {
+    if (resumeAt.current !== null && audioRef.current) {
+      audioRef.current.currentTime = resumeAt.current;
+      audioRef.current.play().catch(() => {});
+      resumeAt.current = null;
+    }
+  };
+
+  if (loading) {
+    return (
+      <div className="flex justify-center py-4">
+        <Loader2 size={20} className="animate-spin text-zinc-500" />
+      </div>
+    );
+  }
+
+  if (files.length === 0) {
+    return <p className="text-sm text-zinc-500 py-2">No audio files found on disk</p>;
+  }
+
+  const file = files[current];
+
+  return (
+    <div className="space-y-3">
+      {file?.stream_url && (
+        <audio
+          ref={audioRef}
+          key={file.stream_url}
+          src={mediaUrl(file.stream_url)}
+          controls
+          autoPlay
+          preload="metadata"
+          onError={handleError}
+          onLoadedMetadata={handleLoaded}
+          onEnded={() => setCurrent((c) => Math.min(files.length - 1, c + 1))}
+          className="w-full"
+        />
+      )}
+      <ol className="max-h-60 overflow-y-auto text-sm divide-y divide-zinc-800">
+        {files.map((f, i) => (
+          <li key={f.name}>
+            <button
+              onClick={() => setCurrent(i)}
+              disabled={!!f.error}
+              className={`flex w-full justify-between px-2 py-1.5 text-left transition-colors disabled:opacity-50 ${
+                i === current ? "text-emerald-400" : "text-zinc-400 hover:text-zinc-100"
+              }`}
+            >
+              <span className="truncate">{f.name}</span>
+              <span className="ml-4 shrink-0 text-zinc-500">{formatDuration(f.duration)}</span>
+            </button>
+          </li>
+        ))}
+      </ol>
+    </div>
+  );
+}
@@ -13,6 +13,9 @@ interface QueueItemData {
   total_chapters: number;
   error_message?: string;
   eta_seconds?: number;
+  bytes_done?: number;
+  bytes_total?: number;
+  rate_bps?: number;
 }
 
 interface QueueItemProps {
@@ -22,9 +25,11 @@ interface QueueItemProps {
 }
 
 export default function QueueItem({ item, onRemove, onRetry }: QueueItemProps) {
-  const progress = item.total_chapters > 0
-    ? Math.round((item.current_chapter / item.total_chapters) * 100)
-    : 0;
+  const progress = item.bytes_total
+    ? Math.round(((item.bytes_done || 0) / item.bytes_total) * 100)
+    : item.total_chapters > 0
+      ? Math.round((item.current_chapter / item.total_chapters) * 100)
+      : 0;
 
   const statusColors: Record<string, string> = {
     pending: "text-zinc-400",
@@ -49,6 +54,11 @@ export default function QueueItem({ item, onRemove, onRetry }: QueueItemProps) {
     }
   };
 
+  const formatRate = (bytesPerSecond: number): string => {
+    if (bytesPerSecond >= 1024 * 1024) return `${(bytesPerSecond / (1024 * 1024)).toFixed(1)} MB/s`;
+    return `${Math.round(bytesPerSecond / 1024)} KB/s`;
+  };
+
   const formatETA = (seconds: number): string => {
     if (seconds < 60) return "< 1 min remaining";
     const hours = Math.floor(seconds / 3600);
@@ -82,6 +92,11 @@ export default function QueueItem({ item, onRemove, onRetry }: QueueItemProps) {
                     • {formatETA(item.eta_seconds)}
                   </span>
                 )}
+                {!!item.rate_bps && (
+                  <span className="text-zinc-500">
+                    • {formatRate(item.rate_bps)}
+                  </span>
+                )}
               </>
             )}
           </div>
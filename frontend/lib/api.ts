@@ -8,7 +8,8 @@ function getToken(): string | null {
 async function fetchWithAuth(url: string, options: RequestInit = {}) {
   const token = getToken();
   const headers: HeadersInit = {
-    "Content-Type": "application/json",
+    // Let the browser set the multipart boundary for uploads
+    ...(options.body instanceof FormData ? {} : { "Content-Type": "application/json" }),
     ...(options.headers || {}),
   };
 
@@ -121,12 +122,29 @@ export async function searchWithProgress(
   throw new Error("Search completed without results");
 }
 
-export async function getQueue() {
-  const response = await fetchWithAuth("/api/queue");
+export async function getQueue(
+  options: { status?: string; limit?: number; cursor?: string; since?: string } = {}
+) {
+  const params = new URLSearchParams();
+  if (options.status) params.set("status", options.status);
+  if (options.limit) params.set("limit", String(options.limit));
+  if (options.cursor) params.set("cursor", options.cursor);
+  if (options.since) params.set("since", options.since);
+
+  // The API answers unchanged polls with 304s, which fetch resolves from the HTTP cache
+  const response = await fetchWithAuth(`/api/queue?${params}`);
   if (!response.ok) throw new Error("Failed to fetch queue");
   return response.json();
 }
 
+export async function importQueueFile(file: File) {
+  const body = new FormData();
+  body.append("file", file);
+  const response = await fetchWithAuth("/api/queue/import/file", { method: "POST", body });
+  if (!response.ok) throw new Error("Failed to import reading list");
+  return response.json();
+}
+
 export async function addToQueue(urls: string[]) {
   const response = await fetchWithAuth("/api/queue", {
     method: "POST",
@@ -152,9 +170,10 @@ export async function retryDownload(id: number) {
   return response.json();
 }
 
-export async function getDownloads(page = 1, limit = 20, search?: string) {
+export async function getDownloads(page = 1, limit = 20, search?: string, cursor?: string) {
   const params = new URLSearchParams({ page: String(page), limit: String(limit) });
   if (search) params.set("search", search);
+  if (cursor) params.set("cursor", cursor);
 
   const response = await fetchWithAuth(`/api/downloads?${params}`);
   if (!response.ok) throw new Error("Failed to fetch downloads");
@@ -169,6 +188,17 @@ export async function deleteDownload(id: number) {
   return response.json();
 }
 
+export async function getLibraryBook(id: number) {
+  const response = await fetchWithAuth(`/api/library/${id}`);
+  if (!response.ok) throw new Error("Failed to fetch book files");
+  return response.json();
+}
+
+// Signed chapter URLs from the API are paths; <audio> needs them absolute
+export function mediaUrl(path: string): string {
+  return `${API_BASE}${path}`;
+}
+
 export function isAuthenticated(): boolean {
   return !!getToken();
 }
@@ -1,7 +1,7 @@
 const API_BASE = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
 
 export type SSEEvent = {
-  type: "queue_update" | "download_progress" | "download_complete" | "download_error" | "ping";
+  type: "snapshot" | "queue_update" | "download_progress" | "download_complete" | "download_error" | "ping";
   data: Record<string, unknown>;
 };
 
@@ -20,6 +20,15 @@ export function createSSEConnection(onEvent: (event: SSEEvent) => void): () => v
     }
   };
 
+  // Sent on connect: current state of every tracked item
+  eventSource.addEventListener("snapshot", (event: MessageEvent) => {
+    try {
+      onEvent({ type: "snapshot", data: JSON.parse(event.data) });
+    } catch {
+      // Ignore
+    }
+  });
+
   eventSource.addEventListener("queue_update", (event: MessageEvent) => {
     try {
       onEvent({ type: "queue_update", data: JSON.parse(event.data) });